@@ -0,0 +1,30 @@
+"""add source content hash
+
+Revision ID: 3b9c1d7e2f40
+Revises: e4f5b0d520a3
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9c1d7e2f40'
+down_revision: Union[str, Sequence[str], None] = 'e4f5b0d520a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sources', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_sources_content_hash'), 'sources', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sources_content_hash'), table_name='sources')
+    op.drop_column('sources', 'content_hash')
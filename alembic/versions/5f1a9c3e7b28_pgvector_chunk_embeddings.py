@@ -0,0 +1,54 @@
+"""pgvector chunk embeddings
+
+Revision ID: 5f1a9c3e7b28
+Revises: 8d2e6f0a4c15
+Create Date: 2026-10-18 15:12:44.103318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.config.app_config import getAppConfig
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1a9c3e7b28'
+down_revision: Union[str, Sequence[str], None] = '8d2e6f0a4c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+dimensions = getAppConfig().embedding_dimensions
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(
+        f"ALTER TABLE chunks ALTER COLUMN embedding TYPE vector({dimensions}) "
+        f"USING embedding::vector({dimensions})"
+    )
+    op.add_column('chunks', sa.Column('metadata', postgresql.JSONB(), server_default='{}', nullable=False))
+    op.create_index('ix_chunks_user_id_source_id', 'chunks', ['user_id', 'source_id'], unique=False)
+    op.create_index(
+        'ix_chunks_embedding_hnsw',
+        'chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chunks_embedding_hnsw', table_name='chunks')
+    op.drop_index('ix_chunks_user_id_source_id', table_name='chunks')
+    op.drop_column('chunks', 'metadata')
+    op.execute(
+        "ALTER TABLE chunks ALTER COLUMN embedding TYPE double precision[] "
+        "USING embedding::real[]::double precision[]"
+    )
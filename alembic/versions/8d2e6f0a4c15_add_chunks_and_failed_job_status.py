@@ -0,0 +1,45 @@
+"""add chunks and failed job status
+
+Revision ID: 8d2e6f0a4c15
+Revises: 3b9c1d7e2f40
+Create Date: 2026-10-18 11:40:07.562931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e6f0a4c15'
+down_revision: Union[str, Sequence[str], None] = '3b9c1d7e2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TYPE job_status_enum ADD VALUE IF NOT EXISTS 'FAILED'")
+    op.create_table('chunks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('source_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('embedding', sa.ARRAY(sa.Float()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['source_id'], ['sources.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chunks_source_id'), 'chunks', ['source_id'], unique=False)
+    op.create_index(op.f('ix_chunks_user_id'), 'chunks', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chunks_user_id'), table_name='chunks')
+    op.drop_index(op.f('ix_chunks_source_id'), table_name='chunks')
+    op.drop_table('chunks')
+    # postgres cannot drop a value from an enum type; FAILED stays in job_status_enum
@@ -0,0 +1,31 @@
+"""chunk full text search
+
+Revision ID: a7c4e2d9f613
+Revises: 5f1a9c3e7b28
+Create Date: 2026-10-18 16:03:21.447902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c4e2d9f613'
+down_revision: Union[str, Sequence[str], None] = '5f1a9c3e7b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunks', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', text)", persisted=True), nullable=True))
+    op.create_index('ix_chunks_search_vector', 'chunks', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chunks_search_vector', table_name='chunks', postgresql_using='gin')
+    op.drop_column('chunks', 'search_vector')
@@ -0,0 +1,33 @@
+"""chunk content hash
+
+Revision ID: c3e9a7b5d214
+Revises: a7c4e2d9f613
+Create Date: 2026-10-18 17:25:09.318455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a7b5d214'
+down_revision: Union[str, Sequence[str], None] = 'a7c4e2d9f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chunks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.execute(
+        "UPDATE chunks SET content_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex')"
+    )
+    op.create_index('ix_chunks_source_id_content_hash', 'chunks', ['source_id', 'content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chunks_source_id_content_hash', table_name='chunks')
+    op.drop_column('chunks', 'content_hash')
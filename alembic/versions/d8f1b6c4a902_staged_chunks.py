@@ -0,0 +1,47 @@
+"""staged chunks
+
+Revision ID: d8f1b6c4a902
+Revises: c3e9a7b5d214
+Create Date: 2026-10-18 21:04:51.227306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+from app.config.app_config import getAppConfig
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f1b6c4a902'
+down_revision: Union[str, Sequence[str], None] = 'c3e9a7b5d214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+dimensions = getAppConfig().embedding_dimensions
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'staged_chunks',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('job_id', sa.UUID(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('text', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('metadata', postgresql.JSONB(), server_default='{}', nullable=False),
+        sa.Column('embedding', Vector(dimensions), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'chunk_index'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('staged_chunks')
@@ -1,9 +1,26 @@
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+
+from app.firebase_auth import firebase_verifier
+from app.helper import RequestBodyLimitMiddleware
+from app.metrics import CONTENT_TYPE_LATEST, mark_process_dead, render_metrics
+from app.passwords import password_executor
+from app.routing import auth, chat, note, user
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await firebase_verifier.start()
+    yield
+    await firebase_verifier.stop()
+    password_executor.shutdown()
+    mark_process_dead()
 
-from app.routing import auth, note, user
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 @app.exception_handler(HTTPException)
@@ -18,6 +35,7 @@ app_v1 = APIRouter(prefix="/v1/api")
 app_v1.include_router(auth.router)
 app_v1.include_router(user.router)
 app_v1.include_router(note.router)
+app_v1.include_router(chat.router)
 
 
 @app_v1.get("/", tags=["root"])
@@ -26,3 +44,15 @@ def read_root():
 
 
 app.include_router(app_v1)
+app.add_middleware(
+    RequestBodyLimitMiddleware,
+    limits={
+        f"{app_v1.prefix}{note.router.prefix}{path}": limit
+        for path, limit in note.UPLOAD_BODY_LIMITS.items()
+    },
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
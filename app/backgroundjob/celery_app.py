@@ -1,9 +1,19 @@
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
 
 celery_app = Celery(
     "backgroundjob",
     broker="redis://localhost:6379/0",
     backend="redis://localhost:6379/1",
+    include=[
+        "app.backgroundjob.tasks.examplejob",
+        "app.backgroundjob.tasks.documentsjob",
+        "app.backgroundjob.tasks.ingestjob",
+    ],
 )
 
 celery_app.conf.update(
@@ -13,5 +23,42 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    # one queue per ingestion stage so cpu-bound extraction workers scale
+    # apart from the io-bound ones, e.g.
+    #   celery -A app.backgroundjob.celery_app worker -Q extract -c 2
+    #   DOCLING_WARM_ON_INIT=false celery -A app.backgroundjob.celery_app \
+    #       worker -Q download,chunk,embed,store,summarize -c 16
+    task_routes={
+        "ingest.download": {"queue": "download"},
+        "ingest.extract": {"queue": "extract"},
+        "ingest.pipeline": {"queue": "extract"},
+        "ingest.record_extraction": {"queue": "extract"},
+        "documents.*": {"queue": "extract"},
+        "ingest.chunk": {"queue": "chunk"},
+        "ingest.embed": {"queue": "embed"},
+        "ingest.store": {"queue": "store"},
+        "ingest.summarize": {"queue": "summarize"},
+        "ingest.reindexed": {"queue": "store"},
+        "ingest.failed": {"queue": "store"},
+    },
 )
-celery_app.autodiscover_tasks(["app.backgroundjob.tasks"])
+
+
+@worker_process_init.connect
+def warm_document_converters(**kwargs):
+    if not app_config.docling_warm_on_init:
+        return
+    from app.extractor.documents import init_converters
+
+    init_converters()
+
+
+@worker_process_shutdown.connect
+def flush_job_progress(**kwargs):
+    from app.backgroundjob.progress import reporter
+    from app.metrics import mark_process_dead
+
+    reporter.flush()
+    mark_process_dead()
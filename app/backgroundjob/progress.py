@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.client import PubSub
+from sqlalchemy import bindparam, update
+
+from app.config.app_config import getAppConfig
+from app.database.db import SessionLocal
+from app.database.schema.job_schema import Jobs, JobStatusEnum
+
+app_config = getAppConfig()
+
+TERMINAL_STATUSES = (JobStatusEnum.COMPLETED.value, JobStatusEnum.FAILED.value)
+
+_redis: redis.Redis | None = None
+
+
+def progress_channel(job_id: str) -> str:
+    return f"job-progress:{job_id}"
+
+
+def progress_state_key(job_id: str) -> str:
+    return f"job-progress:{job_id}:state"
+
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(app_config.redis_url)
+    return _redis
+
+
+def _decode_state(raw: dict) -> dict | None:
+    if not raw:
+        return None
+    state = {
+        (k.decode() if isinstance(k, bytes) else k): (
+            v.decode() if isinstance(v, bytes) else v
+        )
+        for k, v in raw.items()
+    }
+    if "progress" in state:
+        state["progress"] = int(state["progress"])
+    return state
+
+
+def publish_progress(job_id: str, fields: dict) -> None:
+    # the live state lives in a redis hash between database flushes; every
+    # change is merged there and the full state is fanned out to subscribers
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(
+            progress_state_key(job_id),
+            mapping={k: v for k, v in fields.items() if v is not None},
+        )
+        pipe.expire(progress_state_key(job_id), app_config.progress_state_ttl)
+        pipe.hgetall(progress_state_key(job_id))
+        state = _decode_state(pipe.execute()[-1])
+        get_redis().publish(progress_channel(job_id), json.dumps(state))
+    except redis.RedisError as e:
+        # subscribers fall back to the jobs row, never fail the stage over it
+        print(f"failed to publish progress for {job_id}: {e}")
+
+
+class ProgressReporter:
+    """Write-behind buffer for ``Jobs`` progress.
+
+    Updates are coalesced per job and flushed in one batched UPDATE at most
+    every ``flush_interval`` seconds. Status changes are flushed right away.
+    Flushes are serialized, and a buffered update without a status change
+    never lowers a job's progress or touches a finished job, so a late
+    flush (from this process or another stage's worker) cannot roll a
+    completed job back.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def _ensure_flusher(self) -> None:
+        # celery forks workers after import, so start the thread per process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name="progress-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"progress flush failed: {e}")
+
+    def report(
+        self,
+        job_id: str,
+        step: str,
+        progress: int | None = None,
+        status: JobStatusEnum | None = None,
+        error_info: str | None = None,
+    ) -> None:
+        self._ensure_flusher()
+        values: dict = {"current_step": step}
+        if progress is not None:
+            values["progress"] = progress
+        if status is not None:
+            values["job_status"] = status
+        if error_info is not None:
+            values["error_info"] = error_info
+        with self._lock:
+            self._pending.setdefault(job_id, {}).update(values)
+
+        publish_progress(
+            job_id,
+            {
+                "job_id": job_id,
+                "step": step,
+                "progress": progress,
+                "status": status.value if status else None,
+                "error_info": error_info,
+            },
+        )
+        if status is not None:
+            self.flush()
+
+    def flush(self) -> None:
+        # held from the swap to the commit, so batches reach the database in
+        # the order they were taken
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        now = datetime.now(timezone.utc)
+        batches: dict[tuple, list[dict]] = {}
+        for job_id, values in pending.items():
+            row = {"_id": uuid.UUID(job_id), "updated_at": now, **values}
+            if "progress" in values:
+                row["_progress"] = values["progress"]
+            batches.setdefault(tuple(sorted(row)), []).append(row)
+        try:
+            with SessionLocal() as db:
+                for columns, rows in batches.items():
+                    db.execute(_update_statement(columns), rows)
+                db.commit()
+        except Exception:
+            # keep the coalesced values for the next attempt unless newer
+            # updates for the same job arrived in the meantime
+            with self._lock:
+                for job_id, values in pending.items():
+                    self._pending[job_id] = {**values, **self._pending.get(job_id, {})}
+            raise
+
+
+def _update_statement(columns: tuple):
+    jobs = Jobs.__table__
+    statement = update(jobs).where(jobs.c.id == bindparam("_id"))
+    if "job_status" in columns:
+        return statement
+    statement = statement.where(
+        jobs.c.job_status.notin_([JobStatusEnum.COMPLETED, JobStatusEnum.FAILED])
+    )
+    if "progress" in columns:
+        statement = statement.where(jobs.c.progress <= bindparam("_progress"))
+    return statement
+
+
+reporter = ProgressReporter(app_config.progress_flush_interval)
+
+
+def report_progress(
+    job_id: str,
+    step: str,
+    progress: int | None = None,
+    status: JobStatusEnum | None = None,
+    error_info: str | None = None,
+) -> None:
+    reporter.report(job_id, step, progress, status, error_info)
+
+
+_aioredis: aioredis.Redis | None = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    global _aioredis
+    if _aioredis is None:
+        _aioredis = aioredis.Redis.from_url(app_config.redis_url)
+    return _aioredis
+
+
+async def live_progress(job_id: str) -> dict | None:
+    try:
+        raw = await get_async_redis().hgetall(progress_state_key(job_id))
+        return _decode_state(raw)
+    except redis.RedisError as e:
+        print(f"failed to read live progress for {job_id}: {e}")
+        return None
+
+
+@asynccontextmanager
+async def progress_subscription(job_id: str) -> AsyncIterator[PubSub]:
+    pubsub = get_async_redis().pubsub()
+    try:
+        await pubsub.subscribe(progress_channel(job_id))
+        yield pubsub
+    finally:
+        await pubsub.aclose()
+
+
+async def next_progress(pubsub: PubSub, timeout: float) -> dict | None:
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+    if message is None:
+        return None
+    return json.loads(message["data"])
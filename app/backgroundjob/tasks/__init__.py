@@ -0,0 +1,3 @@
+from .examplejob import example_task
+
+__all__ = ["example_task"]
@@ -0,0 +1,4 @@
+def extract_audio(ctx: dict) -> str:
+    from app.extractor.audio import transcribe_audio
+
+    return transcribe_audio(ctx["source_url"])
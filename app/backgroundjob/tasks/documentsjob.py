@@ -0,0 +1,40 @@
+from celery import chord
+
+from app.backgroundjob.celery_app import celery_app
+
+
+# docling is imported inside the tasks so the API process can build
+# signatures without loading the conversion models
+
+
+@celery_app.task(name="documents.convert_pages")
+def convert_document_pages(file_url: str, start: int, end: int) -> str:
+    from app.extractor.documents import convert_page_range_md
+
+    return convert_page_range_md(file_url, start, end)
+
+
+@celery_app.task(name="documents.merge_pages")
+def merge_document_pages(parts: list[str]) -> str:
+    from app.extractor.documents import merge_markdown_parts
+
+    return merge_markdown_parts(parts)
+
+
+def extract_document(ctx: dict) -> str:
+    from app.extractor.documents import convert_doc_md
+
+    return convert_doc_md(ctx["source_url"])
+
+
+def split_document_conversion(file_url: str):
+    # fan a large pdf out over page ranges; None means convert it whole
+    from app.extractor.documents import plan_document_ranges
+
+    ranges = plan_document_ranges(file_url)
+    if not ranges:
+        return None
+    return chord(
+        [convert_document_pages.s(file_url, start, end) for start, end in ranges],
+        merge_document_pages.s(),
+    )
@@ -1,6 +1,6 @@
 import time
 
-from .celery_app import celery_app
+from app.backgroundjob.celery_app import celery_app
 
 
 @celery_app.task(bind=True)
@@ -0,0 +1,301 @@
+import uuid
+from contextlib import contextmanager
+
+import httpx
+import redis
+import requests
+from celery import chain
+from google.genai import errors as genai_errors
+from sqlalchemy.exc import OperationalError
+
+from app.backgroundjob.celery_app import celery_app
+from app.backgroundjob.progress import report_progress
+from app.backgroundjob.tasks.audiojob import extract_audio
+from app.backgroundjob.tasks.documentsjob import (
+    extract_document,
+    split_document_conversion,
+)
+from app.backgroundjob.tasks.youtubejob import extract_youtube
+from app.config.app_config import getAppConfig
+from app.database.db import SessionLocal
+from app.database.schema.job_schema import Jobs, JobStatusEnum
+from app.database.schema.note_schema import Notes, Status
+from app.database.schema.source_schema import SourceTypeEnum
+
+app_config = getAppConfig()
+
+# download -> extract -> chunk -> embed -> store -> summarize, each stage on
+# the queue of the same name (see task_routes in celery_app). Stages hand a
+# small json context dict down the chain; bulky text lives in the notes row
+# and chunks with their vectors in staged_chunks (app/rag/staging.py).
+
+
+class TransientError(Exception):
+    """A failure worth retrying: network, timeout or rate limiting."""
+
+
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code == 429 or exc.code >= 500
+    if isinstance(exc, OperationalError):
+        return exc.connection_invalidated
+    return isinstance(
+        exc,
+        (
+            httpx.TransportError,
+            requests.ConnectionError,
+            requests.Timeout,
+            redis.ConnectionError,
+            redis.TimeoutError,
+            ConnectionError,
+            TimeoutError,
+        ),
+    )
+
+
+@contextmanager
+def _retry_transient():
+    # tasks autoretry on TransientError only; bad input or a missing source
+    # fails the same way on every attempt, so it fails the job right away
+    try:
+        yield
+    except Exception as e:
+        if is_transient(e):
+            raise TransientError(f"{type(e).__name__}: {e}") from e
+        raise
+
+
+def _report(task, job_id: str, step: str, progress: int, status=None) -> None:
+    report_progress(job_id, step, progress, status)
+    if task is not None and task.request.id:
+        task.update_state(state="PROGRESS", meta={"step": step, "percent": progress})
+
+
+@celery_app.task(
+    name="ingest.download",
+    bind=True,
+    autoretry_for=(requests.RequestException,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def download_source(self, job_id: str) -> dict:
+    with SessionLocal() as db:
+        job = db.get(Jobs, uuid.UUID(job_id))
+        if job is None:
+            raise ValueError(f"job {job_id} not found")
+        source = job.source
+        ctx = {
+            "job_id": job_id,
+            "source_id": str(source.id),
+            "user_id": str(source.user_id),
+            "source_type": source.source_type.value,
+            "source_url": source.source_url,
+            "source_name": source.source_name,
+        }
+    _report(self, job_id, "downloading", 5, JobStatusEnum.PROCESSING)
+    if ctx["source_type"] != SourceTypeEnum.YOUTUBE.value:
+        from app.downloader import download_file
+
+        # warms the node cache for the extract stage
+        download_file(ctx["source_url"])
+    _report(self, job_id, "downloaded", 10)
+    return ctx
+
+
+@celery_app.task(name="ingest.record_extraction")
+def record_extraction(markdown: str, ctx: dict) -> dict:
+    with SessionLocal() as db:
+        note = (
+            db.query(Notes)
+            .filter(Notes.source_id == uuid.UUID(ctx["source_id"]))
+            .first()
+        )
+        if note is None:
+            note = Notes(
+                source_id=uuid.UUID(ctx["source_id"]),
+                user_id=uuid.UUID(ctx["user_id"]),
+                title=ctx["source_name"] or "Untitled",
+                content=markdown,
+                status=Status.PENDING,
+            )
+            db.add(note)
+        else:
+            note.content = markdown
+            note.status = Status.PENDING
+        db.commit()
+        ctx = {**ctx, "note_id": str(note.id)}
+    _report(None, ctx["job_id"], "extracted", 35)
+    return ctx
+
+
+@celery_app.task(name="ingest.extract", bind=True)
+def extract_source(self, ctx: dict) -> dict:
+    _report(self, ctx["job_id"], "extracting", 15)
+    source_type = SourceTypeEnum(ctx["source_type"])
+    if source_type == SourceTypeEnum.DOCUMENTS:
+        split = split_document_conversion(ctx["source_url"])
+        if split is not None:
+            # the page-range chord takes over; its merged markdown continues
+            # down the rest of the chain through record_extraction
+            raise self.replace(split | record_extraction.s(ctx))
+        markdown = extract_document(ctx)
+    elif source_type == SourceTypeEnum.AUDIO:
+        markdown = extract_audio(ctx)
+    else:
+        markdown = extract_youtube(ctx)
+    return record_extraction(markdown, ctx)
+
+
+@celery_app.task(name="ingest.chunk", bind=True)
+def chunk_source(self, ctx: dict) -> dict:
+    from app.rag.chuncking import chunk_md
+    from app.rag.staging import stage_chunks
+
+    # first stage of a re-index, so it also moves the job out of queued
+    _report(self, ctx["job_id"], "chunking", 40, JobStatusEnum.PROCESSING)
+    with SessionLocal() as db:
+        note = db.get(Notes, uuid.UUID(ctx["note_id"]))
+        markdown = note.content if note else ""
+    chunks = chunk_md(markdown, ctx["source_id"], ctx["user_id"])
+    staged = stage_chunks(ctx["job_id"], chunks)
+    _report(self, ctx["job_id"], "chunked", 50)
+    return {**ctx, "staged_chunks": staged}
+
+
+@celery_app.task(
+    name="ingest.embed",
+    bind=True,
+    autoretry_for=(TransientError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def embed_chunks(self, ctx: dict) -> dict:
+    from app.rag.embedding import embed_texts
+    from app.rag.staging import load_staged, save_embeddings
+    from app.rag.vector_store import get_vector_store, unstored_chunks
+
+    _report(self, ctx["job_id"], "embedding", 55)
+    # chunks whose text is already stored for this source keep their row and
+    # vector, so only new or edited chunks (and extra copies of a repeated
+    # text) are embedded
+    with _retry_transient():
+        stored = get_vector_store().existing_hashes(ctx["source_id"], ctx["user_id"])
+        staged = load_staged(ctx["job_id"])
+        chunks = [chunk for _, chunk in unstored_chunks(enumerate(staged), stored)]
+        embeddings = embed_texts([chunk["text"] for chunk in chunks])
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk["embedding"] = embedding
+        save_embeddings(chunks)
+    _report(self, ctx["job_id"], "embedded", 75)
+    return ctx
+
+
+@celery_app.task(name="ingest.store", bind=True)
+def store_chunks(self, ctx: dict) -> dict:
+    from app.rag import vector_store
+    from app.rag.staging import clear_staged, load_staged
+
+    _report(self, ctx["job_id"], "storing", 80)
+    chunks = load_staged(ctx["job_id"], embeddings=True)
+    added, removed = vector_store.get_vector_store().sync_source(
+        ctx["source_id"], ctx["user_id"], chunks
+    )
+    clear_staged(ctx["job_id"])
+    print(
+        f"source {ctx['source_id']}: {added} chunks added, {removed} removed, "
+        f"{len(chunks) - added} kept"
+    )
+    _report(self, ctx["job_id"], "stored", 90)
+    return ctx
+
+
+@celery_app.task(name="ingest.pipeline", bind=True)
+def pipeline_source(self, ctx: dict) -> dict:
+    # ingest_mode="pipeline": extract -> chunk -> embed -> store overlapped
+    # in this one task instead of hopping through four queues
+    from app.rag.embedding import run_in_worker_loop
+    from app.rag.pipeline import ingest_source
+
+    _report(self, ctx["job_id"], "extracting", 15)
+    outcome = run_in_worker_loop(ingest_source(ctx))
+    print(f"pipeline for source {ctx['source_id']}:\n{outcome.result.summary()}")
+    ctx = record_extraction(outcome.markdown, ctx)
+    _report(self, ctx["job_id"], "stored", 90)
+    return ctx
+
+
+@celery_app.task(
+    name="ingest.summarize",
+    bind=True,
+    autoretry_for=(TransientError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def summarize_source(self, ctx: dict) -> dict:
+    from app.rag.summary import summarize_markdown
+
+    _report(self, ctx["job_id"], "summarizing", 92)
+    with _retry_transient(), SessionLocal() as db:
+        note = db.get(Notes, uuid.UUID(ctx["note_id"]))
+        if note is not None:
+            note.summary = summarize_markdown(note.content)
+            note.status = Status.DONE
+            db.commit()
+    _report(self, ctx["job_id"], "completed", 100, JobStatusEnum.COMPLETED)
+    return {"job_id": ctx["job_id"], "status": JobStatusEnum.COMPLETED.value}
+
+
+@celery_app.task(name="ingest.reindexed")
+def finish_reindex(ctx: dict) -> dict:
+    _report(None, ctx["job_id"], "completed", 100, JobStatusEnum.COMPLETED)
+    return {"job_id": ctx["job_id"], "status": JobStatusEnum.COMPLETED.value}
+
+
+@celery_app.task(name="ingest.failed")
+def mark_job_failed(request, exc, traceback, job_id: str) -> None:
+    from app.rag.staging import clear_staged
+
+    print(f"job {job_id} failed in {request.task}: {exc}")
+    report_progress(job_id, "failed", status=JobStatusEnum.FAILED, error_info=str(exc))
+    clear_staged(job_id)
+
+
+def _ingestion_chain(job_id: str):
+    if app_config.ingest_mode == "pipeline":
+        return chain(
+            download_source.s(job_id), pipeline_source.s(), summarize_source.s()
+        )
+    return chain(
+        download_source.s(job_id),
+        extract_source.s(),
+        chunk_source.s(),
+        embed_chunks.s(),
+        store_chunks.s(),
+        summarize_source.s(),
+    )
+
+
+def start_ingestion(job_id: str):
+    return _ingestion_chain(job_id).apply_async(link_error=mark_job_failed.s(job_id))
+
+
+def start_reindex(job_id: str, note_id: str, source_id: str, user_id: str):
+    # after a note edit: re-chunk the stored text and sync only the changes
+    ctx = {
+        "job_id": job_id,
+        "note_id": note_id,
+        "source_id": source_id,
+        "user_id": user_id,
+    }
+    return chain(
+        chunk_source.s(ctx), embed_chunks.s(), store_chunks.s(), finish_reindex.s()
+    ).apply_async(link_error=mark_job_failed.s(job_id))
+
+
+def start_ingestions(job_ids: list[str]) -> None:
+    # only call once the jobs are committed; one broker connection for the lot
+    with celery_app.producer_or_acquire() as producer:
+        for job_id in job_ids:
+            _ingestion_chain(job_id).apply_async(
+                link_error=mark_job_failed.s(job_id), producer=producer
+            )
@@ -0,0 +1,4 @@
+def extract_youtube(ctx: dict) -> str:
+    from app.extractor.youtubelink import transcribe_youtube
+
+    return transcribe_youtube(ctx["source_url"])
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.metrics import Counter, Gauge
+
+ANSWER_CACHE = Counter(
+    "chat_answer_cache_requests_total",
+    "Chat answer cache lookups by result",
+    ("result",),
+)
+ANSWER_CACHE_ENTRIES = Gauge(
+    "chat_answer_cache_entries", "Answers held in the chat answer cache"
+)
+
+
+@dataclass
+class CachedAnswer:
+    vector: np.ndarray
+    answer: str
+    sources: list[dict]
+    versions: tuple[int, ...]
+    expires: float
+
+
+def scope_key(user_id, source_ids: list[str] | None) -> str:
+    if not source_ids:
+        return f"{user_id}:*"
+    return f"{user_id}:" + ",".join(sorted(str(s) for s in source_ids))
+
+
+def _unit(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Finished answers keyed by scope and question embedding.
+
+    A lookup matches the closest cached question in the same scope (the
+    user plus the sources asked about) whose cosine similarity reaches
+    ``threshold``, so rephrasings of a question share one answer. Each entry
+    remembers the chunk versions it was answered from and is dropped once
+    they have moved on; the whole cache is LRU-bounded by ``max_entries``
+    and entries also expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600.0, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._scopes: dict[str, list[int]] = {}
+        self._entries: OrderedDict[int, tuple[str, CachedAnswer]] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self, scope: str, embedding: list[float], versions: tuple[int, ...]
+    ) -> CachedAnswer | None:
+        if self.max_entries <= 0:
+            return None
+        vector = _unit(embedding)
+        now = time.monotonic()
+        result = "miss"
+        best: tuple[float, int] | None = None
+        with self._lock:
+            for entry_id in list(self._scopes.get(scope, ())):
+                entry = self._entries[entry_id][1]
+                if entry.expires <= now or entry.versions != versions:
+                    self._remove(entry_id)
+                    result = "stale"
+                    continue
+                similarity = float(vector @ entry.vector)
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, entry_id)
+            ANSWER_CACHE_ENTRIES.set(len(self._entries))
+            if best is not None:
+                self._entries.move_to_end(best[1])
+                ANSWER_CACHE.inc(result="hit")
+                return self._entries[best[1]][1]
+        ANSWER_CACHE.inc(result=result)
+        return None
+
+    def put(
+        self,
+        scope: str,
+        embedding: list[float],
+        versions: tuple[int, ...],
+        answer: str,
+        sources: list[dict],
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        entry = CachedAnswer(
+            _unit(embedding), answer, sources, versions, time.monotonic() + self.ttl
+        )
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, entry)
+            self._scopes.setdefault(scope, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            ANSWER_CACHE_ENTRIES.set(len(self._entries))
+
+    def _remove(self, entry_id: int) -> None:
+        scope, _ = self._entries.pop(entry_id)
+        ids = self._scopes[scope]
+        ids.remove(entry_id)
+        if not ids:
+            del self._scopes[scope]
@@ -0,0 +1,19 @@
+import uuid
+from dataclasses import dataclass
+
+from pydantic import BaseModel, Field
+
+
+class ChatRequest(BaseModel):
+    question: str = Field(..., min_length=1, max_length=4000)
+    # restrict retrieval to these sources, all of the user's sources if empty
+    source_ids: list[uuid.UUID] | None = None
+
+
+@dataclass
+class ContextChunk:
+    source_id: uuid.UUID
+    chunk_index: int
+    text: str
+    score: float
+    tokens: int
@@ -0,0 +1,87 @@
+import math
+
+from app.chat.models import ContextChunk
+from app.rag.vector_store import ChunkHit
+
+SYSTEM_PROMPT = (
+    "You are a study assistant answering questions about the user's own notes. "
+    "Answer only from the numbered context passages. Cite passages as [n]. "
+    "If the context does not contain the answer, say so plainly."
+)
+
+# chunks overlap their neighbours by design; shorter shared runs are noise
+MIN_OVERLAP_CHARS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for english prose; close enough to budget with
+    return math.ceil(len(text) / 4)
+
+
+def _overlap(previous: str, text: str) -> int:
+    # length of the longest suffix of previous that text starts with
+    for size in range(min(len(previous), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return size
+    return 0
+
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[: tokens * 4]
+    # end on a sentence or at least a word boundary
+    for mark in (". ", "\n", " "):
+        position = cut.rfind(mark)
+        if position > len(cut) // 2:
+            return cut[: position + 1].rstrip()
+    return cut
+
+
+def assemble_context(
+    hits: list[ChunkHit], token_budget: int, min_chunk_tokens: int = 64
+) -> list[ContextChunk]:
+    """Pick chunks in rank order until ``token_budget`` is spent.
+
+    Exact duplicates (the same text stored for a re-uploaded source) are
+    dropped, text a chunk shares with an already picked neighbour is
+    trimmed off, and the last chunk is cut short rather than skipped when at
+    least ``min_chunk_tokens`` of budget remain.
+    """
+    picked: list[ContextChunk] = []
+    seen_texts: set[str] = set()
+    by_position: dict[tuple, str] = {}
+    remaining = token_budget
+    for hit in hits:
+        text = hit.text.strip()
+        if not text or text in seen_texts:
+            continue
+        seen_texts.add(text)
+        before = by_position.get((hit.source_id, hit.chunk_index - 1))
+        if before:
+            text = text[_overlap(before, text) :].lstrip()
+        after = by_position.get((hit.source_id, hit.chunk_index + 1))
+        if after:
+            overlap = _overlap(text, after)
+            text = text[: len(text) - overlap].rstrip()
+        if not text:
+            continue
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining < min_chunk_tokens:
+                break
+            text = _truncate(text, remaining)
+            tokens = estimate_tokens(text)
+        picked.append(
+            ContextChunk(hit.source_id, hit.chunk_index, text, hit.score, tokens)
+        )
+        by_position[(hit.source_id, hit.chunk_index)] = hit.text.strip()
+        remaining -= tokens
+        if remaining < min_chunk_tokens:
+            break
+    return picked
+
+
+def build_prompt(question: str, context: list[ContextChunk]) -> str:
+    passages = "\n\n".join(
+        f"[{number}] {chunk.text}" for number, chunk in enumerate(context, start=1)
+    )
+    return f"Context:\n{passages}\n\nQuestion: {question.strip()}"
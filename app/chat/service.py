@@ -0,0 +1,181 @@
+import asyncio
+import time
+from typing import AsyncIterator, Protocol
+
+from google.genai import types
+
+from app.chat.cache import SemanticAnswerCache, scope_key
+from app.chat.models import ContextChunk
+from app.chat.prompt import SYSTEM_PROMPT, assemble_context, build_prompt
+from app.config.app_config import getAppConfig
+from app.metrics import Counter, Histogram
+from app.rag.retriever import HybridRetriever, get_retriever
+from app.rag.versions import current_versions, version_keys
+
+app_config = getAppConfig()
+
+# cached="true" are answers replayed from the semantic answer cache; keep
+# them apart so they don't hide model latency
+CHAT_TTFT = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from receiving a chat question to streaming its first token",
+    ("cached",),
+)
+CHAT_DURATION = Histogram(
+    "chat_answer_duration_seconds",
+    "Time to stream a complete chat answer",
+    ("cached",),
+)
+CHAT_ANSWERS = Counter("chat_answers_total", "Chat answers by outcome", ("outcome",))
+
+
+class ChatBackend(Protocol):
+    def stream(self, system: str, prompt: str) -> AsyncIterator[str]: ...
+
+
+class GeminiChatBackend:
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+
+    async def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(system_instruction=system),
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeChatBackend:
+    """Offline backend: streams the opening of the first passage word by word."""
+
+    def __init__(self, delay: float = 0.0, words: int = 40):
+        self.delay = delay
+        self.words = words
+
+    async def stream(self, system: str, prompt: str) -> AsyncIterator[str]:
+        context = prompt.split("Question:", 1)[0].removeprefix("Context:\n")
+        words = context.split()[: self.words] or ["I", "could", "not", "find", "that."]
+        for i, word in enumerate(words):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word if i == 0 else f" {word}"
+
+
+def _source(chunk: ContextChunk, number: int) -> dict:
+    return {
+        "ref": number,
+        "source_id": str(chunk.source_id),
+        "chunk_index": chunk.chunk_index,
+        "score": chunk.score,
+    }
+
+
+class ChatService:
+    def __init__(
+        self,
+        retriever: HybridRetriever,
+        backend: ChatBackend,
+        token_budget: int = 6000,
+        top_k: int = 12,
+        min_chunk_tokens: int = 64,
+        cache: SemanticAnswerCache | None = None,
+    ):
+        self.retriever = retriever
+        self.backend = backend
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.min_chunk_tokens = min_chunk_tokens
+        self.cache = cache
+
+    async def answer(
+        self, user_id: str, question: str, source_ids: list[str] | None = None
+    ) -> AsyncIterator[dict]:
+        """Stream an answer as events: sources, then tokens, then done."""
+        started = time.perf_counter()
+        scope = scope_key(user_id, source_ids)
+        embedding = versions = None
+        if self.cache is not None:
+            # versions are read before retrieval so a write landing mid-answer
+            # leaves the stored entry already stale
+            embedding, versions = await asyncio.gather(
+                self.retriever.embed_query(question),
+                current_versions(version_keys(user_id, source_ids)),
+            )
+            hit = versions is not None and self.cache.get(scope, embedding, versions)
+            if hit:
+                yield {"type": "sources", "sources": hit.sources}
+                ttft = time.perf_counter() - started
+                CHAT_TTFT.observe(ttft, cached="true")
+                yield {"type": "token", "text": hit.answer}
+                elapsed = time.perf_counter() - started
+                CHAT_DURATION.observe(elapsed, cached="true")
+                CHAT_ANSWERS.inc(outcome="cached")
+                yield {"type": "done", "cached": True, "ttft": ttft, "elapsed": elapsed}
+                return
+
+        retrieval = await self.retriever.retrieve(
+            user_id, question, k=self.top_k, source_ids=source_ids
+        )
+        context = assemble_context(
+            retrieval.hits, self.token_budget, self.min_chunk_tokens
+        )
+        sources = [_source(chunk, i) for i, chunk in enumerate(context, start=1)]
+        yield {"type": "sources", "sources": sources}
+
+        ttft = None
+        parts: list[str] = []
+        async for text in self.backend.stream(
+            SYSTEM_PROMPT, build_prompt(question, context)
+        ):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                CHAT_TTFT.observe(ttft, cached="false")
+            parts.append(text)
+            yield {"type": "token", "text": text}
+
+        elapsed = time.perf_counter() - started
+        CHAT_DURATION.observe(elapsed, cached="false")
+        CHAT_ANSWERS.inc(outcome="answered")
+        if self.cache is not None and versions is not None and context and parts:
+            self.cache.put(scope, embedding, versions, "".join(parts), sources)
+        yield {
+            "type": "done",
+            "cached": False,
+            "ttft": ttft,
+            "elapsed": elapsed,
+            "context_tokens": sum(chunk.tokens for chunk in context),
+            "retrieval": retrieval.timings,
+        }
+
+
+def _make_backend() -> ChatBackend:
+    if app_config.chat_backend == "fake":
+        return FakeChatBackend()
+    from app.config.gemini_config import client
+
+    return GeminiChatBackend(client, app_config.gemini_model)
+
+
+_service: ChatService | None = None
+
+
+def get_chat_service() -> ChatService:
+    global _service
+    if _service is None:
+        _service = ChatService(
+            get_retriever(),
+            _make_backend(),
+            token_budget=app_config.chat_context_tokens,
+            top_k=app_config.chat_top_k,
+            min_chunk_tokens=app_config.chat_min_chunk_tokens,
+            cache=SemanticAnswerCache(
+                app_config.answer_cache_size,
+                app_config.answer_cache_ttl,
+                app_config.answer_cache_threshold,
+            ),
+        )
+    return _service
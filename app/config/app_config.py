@@ -11,11 +11,93 @@ class AppConfig(BaseSettings):
     refresh_token_key: str = ""
     access_token_expire_time: str = ""
     refresh_token_expire_time: str = ""
+    token_cache_size: int = 10000
     db_dev: str = ""
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_slow_query_ms: int = 500
+    # shared by the api and worker processes of a host so /metrics covers
+    # all of them; empty keeps metrics per process
+    metrics_multiproc_dir: str = ""
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 0
+    password_hash_queue_size: int = 64
+    password_hash_queue_timeout: float = 2.0
+    firebase_project_id: str = ""
+    firebase_certs_url: str = (
+        "https://www.googleapis.com/robot/v1/metadata/x509/"
+        "securetoken@system.gserviceaccount.com"
+    )
+    firebase_certs_refresh_margin: float = 300.0
     imagekit_private_key: str = ""
     imagekit_url_endpoint: str = ""
     gemini_api_key: str = ""
     gemini_embedding_model: str = ""
+    gemini_model: str = "gemini-2.5-flash"
+    chunk_tokenizer_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    chunk_max_tokens: int = 512
+    # "gemini" or "fake"; the fake backend needs no network or api key
+    embedding_backend: str = "gemini"
+    embedding_dimensions: int = 768
+    embedding_batch_size: int = 100
+    embedding_batch_max_chars: int = 200_000
+    embedding_concurrency: int = 4
+    embedding_max_retries: int = 5
+    # defaults to redis_url, "memory://" keeps vectors in-process
+    embedding_cache_url: str = ""
+    # seconds, 0 keeps cached vectors until redis evicts them
+    embedding_cache_ttl: int = 0
+    # "pgvector" or "mmap" (per-user numpy indexes under vector_index_dir)
+    vector_backend: str = "pgvector"
+    vector_ef_search: int = 100
+    vector_index_dir: str = "/var/lib/wisenotes/vectors"
+    # 0 searches by brute force, otherwise the number of IVF partitions
+    vector_ivf_lists: int = 0
+    vector_ivf_probe: int = 8
+    vector_compact_ratio: float = 0.3
+    retrieval_candidates: int = 40
+    retrieval_query_cache_size: int = 1024
+    # "gemini" or "fake"; the fake backend streams canned text offline
+    chat_backend: str = "gemini"
+    chat_context_tokens: int = 6000
+    chat_top_k: int = 12
+    chat_min_chunk_tokens: int = 64
+    # defaults to redis_url, "memory://" keeps chunk versions in-process
+    chunk_versions_url: str = ""
+    answer_cache_size: int = 2048
+    answer_cache_ttl: float = 3600.0
+    answer_cache_threshold: float = 0.95
+    redis_url: str = "redis://localhost:6379/2"
+    # "memory://" keeps profiles in-process, handy for tests and local runs
+    profile_cache_url: str = ""
+    profile_cache_ttl: int = 300
+    profile_negative_ttl: float = 30.0
+    profile_negative_max: int = 10000
+    batch_upload_concurrency: int = 8
+    batch_max_items: int = 50
+    progress_flush_interval: float = 2.0
+    progress_state_ttl: int = 24 * 60 * 60
+    download_cache_dir: str = ""
+    download_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    download_chunk_size: int = 1024 * 1024
+    download_pool_size: int = 10
+    download_max_retries: int = 5
+    docling_pool_size: int = 1
+    docling_warm_on_init: bool = True
+    docling_split_threshold_pages: int = 50
+    docling_split_fanout: int = 4
+    # "chain" runs one celery task per stage, "pipeline" overlaps extract,
+    # chunk, embed and store inside a single task (app/rag/pipeline.py)
+    ingest_mode: str = "chain"
+    pipeline_page_window: int = 10
+    pipeline_convert_concurrency: int = 1
+    pipeline_store_batch_size: int = 256
+    pipeline_queue_size: int = 64
     model_config = SettingsConfigDict(env_file=".env")
 
 
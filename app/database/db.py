@@ -1,10 +1,18 @@
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.config.app_config import getAppConfig
+from app.database.instrumentation import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+    pool_options,
+)
 
 Base = declarative_base()
 config = getAppConfig()
@@ -13,9 +21,24 @@ db_url:Optional[str] = (
     if config.app_env == "development"
     else config.db_url
 )
-engine = create_engine(db_url)
+engine = create_engine(
+    db_url, poolclass=InstrumentedQueuePool, **pool_options("sync")
+)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# request handlers use the asyncpg engine so database round trips never block
+# the event loop; celery workers and alembic keep the sync engine above
+async_engine = create_async_engine(
+    make_url(db_url).set(drivername="postgresql+asyncpg"),
+    poolclass=InstrumentedAsyncQueuePool,
+    **pool_options("async"),
+)
+instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -23,3 +46,8 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,86 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config.app_config import getAppConfig
+from app.metrics import Counter, Gauge, Histogram
+
+app_config = getAppConfig()
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ("pool",),
+)
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool", ("pool",)
+)
+STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds", "Latency of executed sql statements", ("pool",)
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total", "Statements slower than db_slow_query_ms", ("pool",)
+)
+
+
+class _CheckoutTimer:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        finally:
+            POOL_CHECKOUT_WAIT.observe(
+                time.perf_counter() - start,
+                pool=self.logging_name or "default",  # type: ignore[attr-defined]
+            )
+
+
+class InstrumentedQueuePool(_CheckoutTimer, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(name: str) -> dict:
+    return {
+        "pool_size": app_config.db_pool_size,
+        "max_overflow": app_config.db_max_overflow,
+        "pool_timeout": app_config.db_pool_timeout,
+        "pool_recycle": app_config.db_pool_recycle,
+        "pool_pre_ping": app_config.db_pool_pre_ping,
+        "pool_logging_name": name,
+    }
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    slow_threshold = app_config.db_slow_query_ms / 1000
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_IN_USE.inc(pool=name)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        POOL_IN_USE.dec(pool=name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        STATEMENT_LATENCY.observe(elapsed, pool=name)
+        if elapsed >= slow_threshold:
+            SLOW_STATEMENTS.inc(pool=name)
+            print(f"slow query ({elapsed * 1000:.0f} ms on {name}): {statement[:500]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection else None
+        if starts:
+            starts.pop()
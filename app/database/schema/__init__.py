@@ -2,4 +2,6 @@ from .user_schema import Users
 from .source_schema import Sources
 from .note_schema import Notes
 from .job_schema import Jobs
-__all__ = ["Users","Sources","Notes","Jobs"]
+from .chunk_schema import Chunks
+from .staged_chunk_schema import StagedChunks
+__all__ = ["Users","Sources","Notes","Jobs","Chunks","StagedChunks"]
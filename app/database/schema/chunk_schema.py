@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Computed, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.config.app_config import getAppConfig
+
+from ..db import Base
+
+app_config = getAppConfig()
+
+
+class Chunks(Base):
+    __tablename__ = "chunks"
+    __table_args__ = (
+        # every lookup is scoped to one tenant, usually narrowed to a source
+        Index("ix_chunks_user_id_source_id", "user_id", "source_id"),
+        Index("ix_chunks_source_id_content_hash", "source_id", "content_hash"),
+        Index(
+            "ix_chunks_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_chunks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    source_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("sources.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    text: Mapped[str] = mapped_column(String, nullable=False)
+    # sha256 of text; re-indexing keeps rows whose hash is still present
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # "metadata" is reserved on declarative classes, hence the attribute name
+    meta: Mapped[dict] = mapped_column(
+        "metadata", JSONB, nullable=False, default=dict, server_default="{}"
+    )
+    embedding: Mapped[list[float] | None] = mapped_column(
+        Vector(app_config.embedding_dimensions), nullable=True
+    )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('english', text)", persisted=True)
+    )
+    source = relationship("Sources", back_populates="chunks")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
@@ -11,6 +11,7 @@ class JobStatusEnum(enum.Enum):
     QUEUED = "queued"
     PROCESSING = "processing"
     COMPLETED = "completed"
+    FAILED = "failed"
 
 class JobTypeEnum(enum.Enum):
     AUDIO = "audio"
@@ -27,12 +27,16 @@ class Sources(Base):
     source_name: Mapped[str | None] = mapped_column(String, nullable=True)
     duration: Mapped[int | None] = mapped_column(Integer, nullable=True)
     size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64), index=True, nullable=True
+    )
     user_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.id"), nullable=False
     )
     user = relationship("Users", back_populates="sources")
     notes = relationship("Notes", back_populates="source", cascade="all, delete")
     jobs = relationship("Jobs", back_populates="source", cascade="all, delete")
+    chunks = relationship("Chunks", back_populates="source", cascade="all, delete")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config.app_config import getAppConfig
+
+from ..db import Base
+
+app_config = getAppConfig()
+
+
+class StagedChunks(Base):
+    """Chunks of one ingestion job between its chunk, embed and store stages.
+
+    The celery chain only passes the job id around; the chunk texts and
+    their vectors wait here until the store stage syncs them into
+    ``chunks`` and deletes them.
+    """
+
+    __tablename__ = "staged_chunks"
+    __table_args__ = (UniqueConstraint("job_id", "chunk_index"),)
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    job_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("jobs.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    text: Mapped[str] = mapped_column(String, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    meta: Mapped[dict] = mapped_column(
+        "metadata", JSONB, nullable=False, default=dict, server_default="{}"
+    )
+    embedding: Mapped[list[float] | None] = mapped_column(
+        Vector(app_config.embedding_dimensions), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
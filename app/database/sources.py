@@ -0,0 +1,201 @@
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import String, case, cast, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.schema.job_schema import Jobs, JobStatusEnum, JobTypeEnum
+from app.database.schema.note_schema import Notes
+from app.database.schema.source_schema import Sources, SourceTypeEnum
+
+
+@dataclass
+class NewSource:
+    user_id: uuid.UUID
+    source_type: SourceTypeEnum
+    source_url: str | None
+    source_name: str | None = None
+    size: int | None = None
+    content_hash: str | None = None
+    # sources whose outputs are cloned from an identical upload start done
+    completed: bool = False
+
+
+@dataclass
+class RegisteredSource:
+    source_id: uuid.UUID
+    job_id: uuid.UUID
+
+
+async def find_sources_by_hashes(
+    db: AsyncSession, user_id: uuid.UUID, keys: list[tuple[str, SourceTypeEnum]]
+) -> dict[tuple[str, SourceTypeEnum], tuple[Sources, bool]]:
+    # per (hash, type) prefer a source whose pipeline already finished so its
+    # output can be reused, otherwise any earlier upload still lets us skip
+    # the object store. Only the uploader's own sources count: another
+    # user's note may hold their edits, and a hit would tell the uploader
+    # that someone else has the file.
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(Sources, Jobs.job_status)
+        .join(Jobs, Jobs.source_id == Sources.id)
+        .where(
+            Sources.user_id == user_id,
+            Sources.content_hash.in_({content_hash for content_hash, _ in keys}),
+            Sources.source_type.in_({source_type for _, source_type in keys}),
+        )
+        .distinct(Sources.content_hash, Sources.source_type)
+        .order_by(
+            Sources.content_hash,
+            Sources.source_type,
+            case((Jobs.job_status == JobStatusEnum.COMPLETED, 0), else_=1),
+            Sources.created_at,
+        )
+    )
+    found = {
+        (source.content_hash, source.source_type): (
+            source,
+            job_status == JobStatusEnum.COMPLETED,
+        )
+        for source, job_status in result
+    }
+    return {key: found[key] for key in keys if key in found}
+
+
+async def find_source_by_hash(
+    db: AsyncSession, user_id: uuid.UUID, content_hash: str, source_type: SourceTypeEnum
+) -> tuple[Sources | None, bool]:
+    found = await find_sources_by_hashes(db, user_id, [(content_hash, source_type)])
+    return found.get((content_hash, source_type), (None, False))
+
+
+async def bulk_create_sources_with_jobs(
+    db: AsyncSession, sources: list[NewSource]
+) -> list[RegisteredSource]:
+    """Insert sources and their jobs in a single statement.
+
+    The sources insert runs as a data-modifying CTE whose RETURNING rows feed
+    the jobs insert, so registering any number of sources is one round trip.
+    The caller owns the transaction and should only dispatch work after
+    committing.
+    """
+    if not sources:
+        return []
+    source_ids = [uuid.uuid4() for _ in sources]
+    inserted = (
+        insert(Sources)
+        .values(
+            [
+                {
+                    "id": source_id,
+                    "source_type": source.source_type,
+                    "source_url": source.source_url,
+                    "source_name": source.source_name,
+                    "size": source.size,
+                    "content_hash": source.content_hash,
+                    "user_id": source.user_id,
+                    "created_at": func.now(),
+                }
+                for source_id, source in zip(source_ids, sources)
+            ]
+        )
+        .returning(Sources.id, Sources.source_type)
+        .cte("inserted_sources")
+    )
+    completed = {
+        source_id for source_id, source in zip(source_ids, sources) if source.completed
+    }
+    is_completed = inserted.c.id.in_(completed) if completed else literal(False)
+    stmt = (
+        insert(Jobs)
+        .from_select(
+            [
+                "id",
+                "source_id",
+                "job_type",
+                "job_status",
+                "progress",
+                "current_step",
+                "retry_count",
+                "created_at",
+                "updated_at",
+            ],
+            select(
+                func.gen_random_uuid(),
+                inserted.c.id,
+                cast(cast(inserted.c.source_type, String), Jobs.job_type.type),
+                case(
+                    (is_completed, literal(JobStatusEnum.COMPLETED, Jobs.job_status.type)),
+                    else_=literal(JobStatusEnum.QUEUED, Jobs.job_status.type),
+                ),
+                case((is_completed, 100), else_=0),
+                case((is_completed, "deduplicated"), else_="queued"),
+                literal(0),
+                func.now(),
+                func.now(),
+            ),
+        )
+        .returning(Jobs.id, Jobs.source_id)
+    )
+    job_ids = {source_id: job_id for job_id, source_id in await db.execute(stmt)}
+    return [
+        RegisteredSource(source_id=source_id, job_id=job_ids[source_id])
+        for source_id in source_ids
+    ]
+
+
+async def create_source_with_job(
+    db: AsyncSession, source: NewSource
+) -> RegisteredSource:
+    [registered] = await bulk_create_sources_with_jobs(db, [source])
+    return registered
+
+
+async def create_reindex_job(db: AsyncSession, source: Sources) -> uuid.UUID:
+    # re-indexing an edited note is tracked like an upload, so clients can
+    # follow it and a failure lands on the job through mark_job_failed
+    job = Jobs(
+        source_id=source.id,
+        job_type=JobTypeEnum(source.source_type.value),
+        job_status=JobStatusEnum.QUEUED,
+        progress=0,
+        current_step="queued",
+        retry_count=0,
+    )
+    db.add(job)
+    await db.flush()
+    return job.id
+
+
+async def clone_source_outputs(
+    db: AsyncSession, canonical_id: uuid.UUID, source_id: uuid.UUID, user_id: uuid.UUID
+) -> None:
+    # copy the user's own note server side; the chunks are copied through the
+    # vector store (clone_source) once this transaction has committed
+    await db.execute(
+        insert(Notes).from_select(
+            [
+                "id",
+                "source_id",
+                "user_id",
+                "title",
+                "content",
+                "summary",
+                "status",
+                "created_at",
+                "updated_at",
+            ],
+            select(
+                func.gen_random_uuid(),
+                literal(source_id, Notes.source_id.type),
+                literal(user_id, Notes.user_id.type),
+                Notes.title,
+                Notes.content,
+                Notes.summary,
+                Notes.status,
+                func.now(),
+                func.now(),
+            ).where(Notes.source_id == canonical_id, Notes.user_id == user_id),
+        )
+    )
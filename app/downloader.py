@@ -0,0 +1,155 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+_session: requests.Session | None = None
+_session_pid: int | None = None
+
+
+def get_session() -> requests.Session:
+    # one pooled session per worker process; celery forks after import so the
+    # pid check keeps children from sharing the parent's sockets
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=app_config.download_pool_size,
+            pool_maxsize=app_config.download_pool_size,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+        _session_pid = os.getpid()
+    return _session
+
+
+class DownloadCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        suffix = Path(urlparse(url).path).suffix or ".tmp"
+        return self.root / f"{key}{suffix}"
+
+    def get(self, url: str) -> Path | None:
+        path = self.path_for(url)
+        if not path.exists():
+            return None
+        # mtime doubles as the LRU clock so every worker on the node shares it
+        os.utime(path)
+        return path
+
+    def evict(self, keep: Path | None = None) -> None:
+        entries = []
+        total = 0
+        for path in self.root.iterdir():
+            if path.suffix in (".part", ".lock"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_cache: DownloadCache | None = None
+
+
+def get_cache() -> DownloadCache:
+    global _cache
+    if _cache is None:
+        root = app_config.download_cache_dir or os.path.join(
+            tempfile.gettempdir(), "wisenotes-downloads"
+        )
+        _cache = DownloadCache(Path(root), app_config.download_cache_max_bytes)
+    return _cache
+
+
+def _stream_to(url: str, part: Path) -> None:
+    session = get_session()
+    attempts = 0
+    while True:
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(
+                url, headers=headers, stream=True, timeout=(10, 60)
+            ) as response:
+                if offset and response.status_code == 416:
+                    # the partial file already holds the whole object
+                    return
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # server ignored the range header, start over
+                    offset = 0
+                with open(part, "ab" if offset else "wb") as fh:
+                    for chunk in response.iter_content(
+                        chunk_size=app_config.download_chunk_size
+                    ):
+                        fh.write(chunk)
+            return
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.Timeout,
+        ) as e:
+            attempts += 1
+            if attempts > app_config.download_max_retries:
+                raise
+            print(f"download of {url} interrupted at {offset} bytes, resuming: {e}")
+            time.sleep(min(2**attempts, 30))
+
+
+def download_file(url: str) -> Path:
+    """Return a local path for ``url``, served from the node cache when possible.
+
+    The returned file belongs to the cache and must not be deleted by callers.
+    """
+    cache = get_cache()
+    cached = cache.get(url)
+    if cached:
+        return cached
+
+    target = cache.path_for(url)
+    with open(f"{target}.lock", "w") as lock_file:
+        # another worker on this node may be fetching the same object
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not target.exists():
+                part = Path(f"{target}.part")
+                _stream_to(url, part)
+                os.replace(part, target)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    cache.evict(keep=target)
+    return target
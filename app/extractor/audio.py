@@ -0,0 +1,24 @@
+from app.config.app_config import getAppConfig
+from app.config.gemini_config import client
+from app.downloader import download_file
+
+app_config = getAppConfig()
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe this recording as markdown. Use headings when the topic "
+    "changes and keep the speaker's wording."
+)
+
+
+def transcribe_audio(file_url: str) -> str:
+    local_path = download_file(file_url)
+    uploaded = client.files.upload(file=str(local_path))
+    try:
+        response = client.models.generate_content(
+            model=app_config.gemini_model,
+            contents=[TRANSCRIBE_PROMPT, uploaded],
+        )
+        return response.text or ""
+    finally:
+        if uploaded.name:
+            client.files.delete(name=uploaded.name)
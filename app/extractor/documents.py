@@ -1,14 +1,192 @@
+import math
+import queue
+import re
+from contextlib import contextmanager
+from typing import Iterator
+
+import pypdfium2 as pdfium
+from docling.datamodel.base_models import ConversionStatus, InputFormat
 from docling.document_converter import DocumentConverter
+from docling_core.types.doc import DoclingDocument
+
+from app.config.app_config import getAppConfig
+from app.downloader import download_file
+
+app_config = getAppConfig()
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$")
+_TABLE_SEP = re.compile(r"^\s*\|(\s*:?-+:?\s*\|)+\s*$")
+
+# warm converters for this process; layout/OCR models load once per converter
+_converters: "queue.Queue[DocumentConverter] | None" = None
+
 
-from app.helper import download_file
+def init_converters(pool_size: int | None = None) -> None:
+    global _converters
+    size = pool_size or app_config.docling_pool_size
+    pool: "queue.Queue[DocumentConverter]" = queue.Queue(maxsize=size)
+    for _ in range(size):
+        converter = DocumentConverter()
+        converter.initialize_pipeline(InputFormat.PDF)
+        pool.put(converter)
+    _converters = pool
+
+
+@contextmanager
+def checkout_converter() -> Iterator[DocumentConverter]:
+    if _converters is None:
+        init_converters()
+    assert _converters is not None
+    converter = _converters.get()
+    try:
+        yield converter
+    finally:
+        _converters.put(converter)
 
 
 def convert_doc_md(file_url: str) -> str:
     local_path = download_file(file_url)
-    try:
-        converter = DocumentConverter()
+    with checkout_converter() as converter:
         result = converter.convert(str(local_path))
-        markdown = result.document.export_to_markdown()
-        return markdown
+    markdown = result.document.export_to_markdown()
+    return markdown
+
+
+def convert_docs_md(file_urls: list[str]) -> list[str | None]:
+    # returns markdown per url in input order, None where conversion failed
+    local_paths = {url: str(download_file(url)) for url in file_urls}
+    markdowns: dict[str, str] = {}
+    with checkout_converter() as converter:
+        results = converter.convert_all(
+            list(dict.fromkeys(local_paths.values())), raises_on_error=False
+        )
+        for result in results:
+            if result.status not in (
+                ConversionStatus.SUCCESS,
+                ConversionStatus.PARTIAL_SUCCESS,
+            ):
+                print(f"failed to convert {result.input.file}: {result.errors}")
+                continue
+            markdowns[str(result.input.file)] = result.document.export_to_markdown()
+    return [markdowns.get(local_paths[url]) for url in file_urls]
+
+
+def count_pages(local_path: str) -> int | None:
+    if not local_path.lower().endswith(".pdf"):
+        return None
+    pdf = pdfium.PdfDocument(local_path)
+    try:
+        return len(pdf)
     finally:
-        local_path.unlink(missing_ok=True)
+        pdf.close()
+
+
+def plan_page_ranges(
+    page_count: int | None,
+    threshold: int | None = None,
+    fanout: int | None = None,
+) -> list[tuple[int, int]]:
+    # 1-based inclusive ranges, empty when the document should not be split
+    threshold = threshold or app_config.docling_split_threshold_pages
+    fanout = fanout or app_config.docling_split_fanout
+    if not page_count or page_count <= threshold or fanout < 2:
+        return []
+    size = math.ceil(page_count / fanout)
+    return [
+        (start, min(start + size - 1, page_count))
+        for start in range(1, page_count + 1, size)
+    ]
+
+
+def plan_document_ranges(file_url: str) -> list[tuple[int, int]]:
+    return plan_page_ranges(count_pages(str(download_file(file_url))))
+
+
+def page_windows(file_url: str, window: int) -> list[tuple[int, int]]:
+    # consecutive 1-based ranges of at most `window` pages; empty for
+    # formats without pages, which convert in one go
+    page_count = count_pages(str(download_file(file_url)))
+    if not page_count or window < 1:
+        return []
+    return [
+        (start, min(start + window - 1, page_count))
+        for start in range(1, page_count + 1, window)
+    ]
+
+
+def convert_document(
+    file_url: str, page_range: tuple[int, int] | None = None
+) -> DoclingDocument:
+    local_path = download_file(file_url)
+    with checkout_converter() as converter:
+        if page_range is None:
+            result = converter.convert(str(local_path))
+        else:
+            result = converter.convert(str(local_path), page_range=page_range)
+    return result.document
+
+
+def convert_page_range_md(file_url: str, start: int, end: int) -> str:
+    return convert_document(file_url, (start, end)).export_to_markdown()
+
+
+def _table_cells(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _trailing_table_header(lines: list[str]) -> str | None:
+    i = len(lines) - 1
+    while i > 0 and _TABLE_ROW.match(lines[i]):
+        if _TABLE_SEP.match(lines[i]):
+            return lines[i - 1]
+        i -= 1
+    return None
+
+
+def _join_parts(merged: list[str], lines: list[str]) -> list[str]:
+    last, first = merged[-1], lines[0]
+
+    # a heading that closed the previous range gets re-emitted by the next one
+    if _HEADING.match(first) and first.strip() == last.strip():
+        return lines[1:]
+
+    # a table cut by the split: docling restarts it with a header of its own
+    if _TABLE_ROW.match(last) and _TABLE_ROW.match(first):
+        header = _trailing_table_header(merged)
+        has_sep = len(lines) > 1 and _TABLE_SEP.match(lines[1])
+        if header and has_sep:
+            prev_cells, cells = _table_cells(header), _table_cells(first)
+            if len(prev_cells) == len(cells):
+                if cells == prev_cells:
+                    return lines[2:]
+                # the first continuation row was promoted to a header
+                return [first] + lines[2:]
+        merged.append("")
+        return lines
+
+    # a paragraph that runs over the page boundary
+    if (
+        last.strip()
+        and not _HEADING.match(last)
+        and not _TABLE_ROW.match(last)
+        and last.rstrip()[-1] not in ".!?:;"
+        and first[:1].islower()
+    ):
+        merged[-1] = f"{last.rstrip()} {first.lstrip()}"
+        return lines[1:]
+
+    merged.append("")
+    return lines
+
+
+def merge_markdown_parts(parts: list[str]) -> str:
+    merged: list[str] = []
+    for part in parts:
+        lines = part.strip("\n").splitlines()
+        if not lines:
+            continue
+        if merged:
+            lines = _join_parts(merged, lines)
+        merged.extend(lines)
+    return "\n".join(merged) + "\n"
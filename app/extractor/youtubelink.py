@@ -0,0 +1,24 @@
+from google.genai import types
+
+from app.config.app_config import getAppConfig
+from app.config.gemini_config import client
+
+app_config = getAppConfig()
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe this video as markdown. Use headings when the topic changes "
+    "and keep the speaker's wording."
+)
+
+
+def transcribe_youtube(url: str) -> str:
+    response = client.models.generate_content(
+        model=app_config.gemini_model,
+        contents=types.Content(
+            parts=[
+                types.Part(file_data=types.FileData(file_uri=url)),
+                types.Part(text=TRANSCRIBE_PROMPT),
+            ]
+        ),
+    )
+    return response.text or ""
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+SERVICE_ACCOUNT_FILE = (
+    Path(__file__).resolve().parent / "config" / "config_file" / "wisenotes_backend.json"
+)
+DEFAULT_CERTS_MAX_AGE = 3600.0
+CERTS_RETRY_SECONDS = 30.0
+
+# returns ({kid: pem certificate}, seconds the response may be cached)
+CertFetcher = Callable[[], Awaitable[tuple[dict[str, str], float]]]
+
+
+class InvalidIdTokenError(Exception):
+    pass
+
+
+def _max_age(cache_control: str | None) -> float:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+
+
+def http_cert_fetcher(url: str) -> CertFetcher:
+    async def fetch() -> tuple[dict[str, str], float]:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+        return response.json(), _max_age(response.headers.get("cache-control"))
+
+    return fetch
+
+
+def _default_project_id() -> str:
+    if app_config.firebase_project_id:
+        return app_config.firebase_project_id
+    try:
+        return json.loads(SERVICE_ACCOUNT_FILE.read_text())["project_id"]
+    except (OSError, KeyError, ValueError):
+        return ""
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens against Google's signing certificates.
+
+    The certificates are fetched once and kept for the max-age Google sends,
+    with a background task refreshing them ``refresh_margin`` seconds before
+    they go stale, so logins never wait on the key endpoint in the steady
+    state. Signature checks run in a worker thread to keep RSA off the loop.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        fetch_certs: CertFetcher,
+        refresh_margin: float = 300.0,
+    ):
+        self.project_id = project_id
+        self.fetch_certs = fetch_certs
+        self.refresh_margin = refresh_margin
+        self._keys: dict = {}
+        self._expires_at = 0.0
+        self._lock: asyncio.Lock | None = None
+        self._refresher: asyncio.Task | None = None
+
+    async def refresh(self, seen_expiry: float | None = None) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if seen_expiry is not None and self._expires_at != seen_expiry:
+                # another caller refreshed while we waited for the lock
+                return
+            certs, max_age = await self.fetch_certs()
+            self._keys = {
+                kid: load_pem_x509_certificate(pem.encode()).public_key()
+                for kid, pem in certs.items()
+            }
+            self._expires_at = time.monotonic() + max_age
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            delay = self._expires_at - self.refresh_margin - time.monotonic()
+            await asyncio.sleep(max(delay, 0.0))
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"failed to refresh firebase certificates: {e}")
+                await asyncio.sleep(CERTS_RETRY_SECONDS)
+
+    async def start(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # not fatal, the first login fetches the keys instead
+            print(f"failed to prefetch firebase certificates: {e}")
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _key_for(self, kid: str):
+        if kid not in self._keys or self._expires_at <= time.monotonic():
+            # unknown kid usually means google rotated keys before our refresh
+            await self.refresh(seen_expiry=self._expires_at)
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidIdTokenError(f"unknown signing key {kid!r}")
+        return key
+
+    def _decode(self, id_token: str, key) -> dict:
+        claims = jwt.decode(
+            id_token,
+            key,
+            algorithms=["RS256"],
+            audience=self.project_id,
+            issuer=f"https://securetoken.google.com/{self.project_id}",
+            options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+        )
+        if not claims["sub"] or len(claims["sub"]) > 128:
+            raise InvalidIdTokenError("invalid subject")
+        if claims.get("auth_time", 0) > time.time() + 60:
+            raise InvalidIdTokenError("auth_time is in the future")
+        return {**claims, "uid": claims["sub"]}
+
+    async def verify(self, id_token: str) -> dict:
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise InvalidIdTokenError(str(e)) from e
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise InvalidIdTokenError("unexpected token header")
+        key = await self._key_for(header["kid"])
+        try:
+            return await asyncio.to_thread(self._decode, id_token, key)
+        except jwt.PyJWTError as e:
+            raise InvalidIdTokenError(str(e)) from e
+
+
+firebase_verifier = FirebaseTokenVerifier(
+    _default_project_id(),
+    http_cert_fetcher(app_config.firebase_certs_url),
+    app_config.firebase_certs_refresh_margin,
+)
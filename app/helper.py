@@ -1,32 +1,45 @@
-import tempfile
+import hashlib
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 from uuid import UUID
 
 import jwt
-import requests
 from fastapi import HTTPException, Request, UploadFile, status
 from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from passlib.context import CryptContext
 
 from app.config.app_config import getAppConfig
 from app.config.imagekit_config import URL_ENDPOINT, imagekit
+from app.metrics import Counter, Gauge
 from app.models.token import TokenReturnValue, Tokens
 
-hasher = CryptContext(schemes=["argon2"])
-
 app_config = getAppConfig()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+TOKEN_CACHE_REQUESTS = Counter(
+    "auth_token_cache_requests_total",
+    "Verified access token cache lookups",
+    ("result",),
+)
+TOKEN_CACHE_ENTRIES = Gauge(
+    "auth_token_cache_entries", "Verified access tokens held in the cache"
+)
+
 
-def hash_password(original_pass: str) -> str:
-    return hasher.hash(original_pass)
+class FileTooLargeError(Exception):
+    pass
 
 
-def verify_hash_password(entered_pass: str, hashed_pss: str) -> bool:
-    return hasher.verify(entered_pass, hashed_pss)
+@dataclass
+class IngestedFile:
+    upload: UploadFile
+    size: int
+    content_hash: str
 
 
 def create_token(user_id: str) -> Tokens:
@@ -65,6 +78,59 @@ def verify_refresh_token(refresh_token: str) -> TokenReturnValue:
     return TokenReturnValue(user_id=decoded_value["user_id"])
 
 
+class TokenCache:
+    """LRU of already verified access tokens.
+
+    Entries are dropped once the token's own ``exp`` passes, so a cached
+    token is never accepted for longer than ``jwt.decode`` would accept it.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[UUID, float]] = OrderedDict()
+
+    def get(self, token: str) -> UUID | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            TOKEN_CACHE_REQUESTS.inc(result="miss")
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            self._entries.pop(token, None)
+            TOKEN_CACHE_ENTRIES.set(len(self._entries))
+            TOKEN_CACHE_REQUESTS.inc(result="miss")
+            return None
+        self._entries.move_to_end(token)
+        TOKEN_CACHE_REQUESTS.inc(result="hit")
+        return user_id
+
+    def put(self, token: str, user_id: UUID, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[token] = (user_id, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        TOKEN_CACHE_ENTRIES.set(len(self._entries))
+
+
+token_cache = TokenCache(app_config.token_cache_size)
+
+
+def _verify_access_token_cached(access_token: str) -> UUID:
+    user_id = token_cache.get(access_token)
+    if user_id is not None:
+        return user_id
+    decoded_value = jwt.decode(
+        access_token, app_config.access_token_key, algorithms="HS256"
+    )
+    if not decoded_value.get("user_id"):
+        raise ValueError("Invalid token payload")
+    user_id = UUID(decoded_value["user_id"])
+    token_cache.put(access_token, user_id, float(decoded_value["exp"]))
+    return user_id
+
+
 async def get_current_user(req: Request) -> UUID:
     auth_header = req.headers.get("Authorization")
 
@@ -79,12 +145,7 @@ async def get_current_user(req: Request) -> UUID:
         if scheme.lower() != "bearer":
             raise ValueError("Invalid auth scheme")
 
-        payload = verify_access_token(token)
-
-        if not payload or not payload.user_id:
-            raise ValueError("Invalid token payload")
-
-        return UUID(payload.user_id)
+        return _verify_access_token_cached(token)
 
     except Exception as e:
         print(f"error in get_current_user: {e}")
@@ -94,10 +155,97 @@ async def get_current_user(req: Request) -> UUID:
         )
 
 
+class RequestBodyLimitMiddleware:
+    """Answer 413 as soon as a request body passes its route's limit.
+
+    FastAPI parses multipart forms (and starlette spools them to disk)
+    before a route handler runs, so a handler can only see an oversized
+    upload after all of it has arrived. This sits in front of that: a
+    declared ``Content-Length`` over the limit is refused before any body
+    is read, and streamed bodies are counted as they arrive. Once a body
+    crosses the limit the client gets the 413, the app sees a disconnect,
+    and anything the app then tries to send is dropped.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(send) -> None:
+        body = b'{"message":"file too large"}'
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_413_CONTENT_TOO_LARGE,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+async def ingest_upload(upload: UploadFile, max_size: int) -> IngestedFile:
+    # RequestBodyLimitMiddleware caps the whole request while it streams in;
+    # this per-file check runs on the spooled file, which is the only place a
+    # single file of a multi-file batch can be measured. Walk it in
+    # fixed-size chunks instead of materialising it with read()
+    if upload.size is not None and upload.size > max_size:
+        raise FileTooLargeError(f"{upload.filename} exceeds {max_size} bytes")
+
+    digest = hashlib.sha256()
+    size = 0
+    await upload.seek(0)
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            raise FileTooLargeError(f"{upload.filename} exceeds {max_size} bytes")
+        digest.update(chunk)
+    await upload.seek(0)
+    return IngestedFile(upload=upload, size=size, content_hash=digest.hexdigest())
+
+
 async def upload_file_to_imagekit(files: UploadFile):
     filename = f"{uuid.uuid4()}{files.filename}"
 
     def _upload():
+        # hand imagekit the spooled file handle so it streams from disk
+        files.file.seek(0)
         return imagekit.files.upload(file=files.file, file_name=filename)
 
     try:
@@ -126,12 +274,3 @@ def extract_youtube_video_id(url: str) -> str | None:
 
     return None
 
-
-def download_file(url: str) -> Path:
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
-    suffix = Path(url).suffix or ".tmp"
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp_file.write(response.content)
-    temp_file.close()
-    return Path(temp_file.name)
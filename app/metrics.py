@@ -0,0 +1,96 @@
+import os
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+# thin wrappers over prometheus_client so call sites pass labels as keyword
+# arguments. With metrics_multiproc_dir set, the api processes and the celery
+# workers on a host write their samples to files in that directory and
+# /metrics aggregates all of them. Empty the directory before they start.
+# prometheus_client picks its value storage on import, hence the env first.
+if app_config.metrics_multiproc_dir:
+    os.makedirs(app_config.metrics_multiproc_dir, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", app_config.metrics_multiproc_dir)
+
+import prometheus_client  # noqa: E402
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, multiprocess  # noqa: E402
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "mark_process_dead",
+    "render_metrics",
+]
+
+
+def _child(metric, labels: dict):
+    return metric.labels(**labels) if labels else metric
+
+
+class Counter:
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self._metric = prometheus_client.Counter(name, description, labelnames)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        _child(self._metric, labels).inc(amount)
+
+
+class Gauge:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        multiprocess_mode: str = "livesum",
+    ):
+        self._metric = prometheus_client.Gauge(
+            name, description, labelnames, multiprocess_mode=multiprocess_mode
+        )
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        _child(self._metric, labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        _child(self._metric, labels).dec(amount)
+
+    def set(self, value: float, **labels) -> None:
+        _child(self._metric, labels).set(value)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets=DEFAULT_BUCKETS,
+    ):
+        self._metric = prometheus_client.Histogram(
+            name, description, labelnames, buckets=buckets
+        )
+
+    def observe(self, value: float, **labels) -> None:
+        _child(self._metric, labels).observe(value)
+
+
+def _multiprocess() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> bytes:
+    if not _multiprocess():
+        return prometheus_client.generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry)
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop an exiting process's live gauges from the multiprocess files."""
+    if _multiprocess():
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -8,3 +8,8 @@ class YoutubeLink(BaseModel):
     def trim_and_validate(cls, value: str) -> str:
         value = value.strip()
         return value
+
+
+class NoteUpdate(BaseModel):
+    content: str
+    title: str | None = None
@@ -0,0 +1,79 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+# hashes made with other parameters still verify; verify_and_update hands
+# back a fresh hash for them so logins migrate users transparently
+hasher = CryptContext(
+    schemes=["argon2"],
+    argon2__time_cost=app_config.argon2_time_cost,
+    argon2__memory_cost=app_config.argon2_memory_cost,
+    argon2__parallelism=app_config.argon2_parallelism,
+)
+
+
+class HashingBusyError(Exception):
+    pass
+
+
+class PasswordHashExecutor:
+    """Runs argon2 on its own threads, away from the shared threadpool.
+
+    argon2-cffi releases the GIL while hashing, so threads scale across
+    cores. At most ``queue_size`` calls may be running or waiting; callers
+    beyond that wait up to ``queue_timeout`` for a slot and then get
+    ``HashingBusyError`` instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_size: int, queue_timeout: float):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="argon2"
+        )
+        self._slots = asyncio.Semaphore(max(queue_size, self.workers))
+
+    async def run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HashingBusyError("password hashing queue is full")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_executor = PasswordHashExecutor(
+    app_config.password_hash_workers,
+    app_config.password_hash_queue_size,
+    app_config.password_hash_queue_timeout,
+)
+
+
+def hash_password(original_pass: str) -> str:
+    return hasher.hash(original_pass)
+
+
+def verify_hash_password(entered_pass: str, hashed_pss: str) -> tuple[bool, str | None]:
+    return hasher.verify_and_update(entered_pass, hashed_pss)
+
+
+async def hash_password_async(original_pass: str) -> str:
+    return await password_executor.run(hash_password, original_pass)
+
+
+async def verify_password_async(
+    entered_pass: str, hashed_pss: str
+) -> tuple[bool, str | None]:
+    return await password_executor.run(verify_hash_password, entered_pass, hashed_pss)
@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from app.config.app_config import getAppConfig
+from app.database.schema.user_schema import Users
+from app.metrics import Counter
+
+app_config = getAppConfig()
+
+PROFILE_CACHE_REQUESTS = Counter(
+    "user_profile_cache_requests_total",
+    "User profile cache lookups by result",
+    ("result",),
+)
+
+
+def profile_key(user_id: UUID | str) -> str:
+    return f"user-profile:{user_id}"
+
+
+def serialize_profile(user: Users) -> dict:
+    return {
+        "user_id": str(user.id),
+        "email": user.email,
+        "auth_provider": user.auth_provider.value,
+        "plan": user.plan.value,
+        "google_id": user.google_id,
+        "profile_img": user.profile_img,
+        "is_active": user.is_active,
+        "user_agent": user.user_device,
+        "created_at": user.created_at.isoformat(),
+    }
+
+
+class RedisProfileStore:
+    def __init__(self, url: str):
+        self.url = url
+        self._client: aioredis.Redis | None = None
+        self._sync_client: redis.Redis | None = None
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            self._client = aioredis.Redis.from_url(self.url)
+        return self._client
+
+    async def get(self, key: str) -> str | None:
+        value = await self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        await self.client.delete(*keys)
+
+    def delete_sync(self, *keys: str) -> None:
+        # writes from celery workers or scripts have no event loop to run on
+        if self._sync_client is None:
+            self._sync_client = redis.Redis.from_url(self.url)
+        self._sync_client.delete(*keys)
+
+
+class MemoryProfileStore:
+    """In-process stand-in for redis, selected with ``memory://``."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._values[key]
+                return None
+            return entry[0]
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, *keys: str) -> None:
+        self.delete_sync(*keys)
+
+    def delete_sync(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+
+
+class NegativeCache:
+    """Per-process set of user ids known not to exist.
+
+    Stops a stream of requests carrying a valid token for a deleted or
+    never-created user from reaching the database every time. Entries are
+    short lived since another process may create the user meanwhile.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(user_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return False
+            return True
+
+    def add(self, user_id: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = time.monotonic() + self.ttl
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def _make_store(url: str) -> RedisProfileStore | MemoryProfileStore:
+    if url.startswith("memory://"):
+        return MemoryProfileStore()
+    return RedisProfileStore(url or app_config.redis_url)
+
+
+store = _make_store(app_config.profile_cache_url)
+missing_users = NegativeCache(
+    app_config.profile_negative_ttl, app_config.profile_negative_max
+)
+
+
+async def get_user_profile(db: AsyncSession, user_id: UUID) -> dict | None:
+    """Read-through lookup of the serialized profile served by ``/auth/me``."""
+    if str(user_id) in missing_users:
+        PROFILE_CACHE_REQUESTS.inc(result="negative")
+        return None
+    key = profile_key(user_id)
+    try:
+        cached = await store.get(key)
+    except redis.RedisError as e:
+        print(f"profile cache read failed for {user_id}: {e}")
+        cached = None
+    if cached is not None:
+        PROFILE_CACHE_REQUESTS.inc(result="hit")
+        return json.loads(cached)
+
+    PROFILE_CACHE_REQUESTS.inc(result="miss")
+    user = await db.scalar(select(Users).where(Users.id == user_id))
+    if user is None:
+        missing_users.add(str(user_id))
+        return None
+    profile = serialize_profile(user)
+    try:
+        await store.set(key, json.dumps(profile), app_config.profile_cache_ttl)
+    except redis.RedisError as e:
+        print(f"profile cache write failed for {user_id}: {e}")
+    return profile
+
+
+async def _invalidate_async(keys: list[str]) -> None:
+    try:
+        await store.delete(*keys)
+    except redis.RedisError as e:
+        print(f"profile cache invalidation failed: {e}")
+
+
+def invalidate_profiles(user_ids: set[str]) -> None:
+    """Drop cached profiles before returning, so the next read sees the write."""
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        missing_users.discard(user_id)
+    keys = [profile_key(user_id) for user_id in user_ids]
+    if in_greenlet():
+        # called from AsyncSession.commit(): wait for the delete on the
+        # session's event loop, the same way its own queries are awaited
+        await_only(_invalidate_async(keys))
+        return
+    try:
+        store.delete_sync(*keys)
+    except redis.RedisError as e:
+        print(f"profile cache invalidation failed: {e}")
+
+
+# any committed write to a Users row (plan change, google linking,
+# deactivation, password upgrade) drops the cached profile. AsyncSession
+# runs these hooks on its underlying sync Session, so one listener covers both.
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_writes(session: Session, flush_context) -> None:
+    touched = session.info.setdefault("profile_invalidations", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Users) and obj.id is not None:
+            touched.add(str(obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    invalidate_profiles(session.info.pop("profile_invalidations", set()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("profile_invalidations", None)
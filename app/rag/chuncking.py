@@ -1,15 +1,87 @@
-from langchain_text_splitters import MarkdownTextSplitter
-
-
-def chunk_md(mdtext: str, source_id: str, user_id: str):
-    splitter = MarkdownTextSplitter(chunk_size=1000, chunk_overlap=200)
-    docs = splitter.create_documents([mdtext])
-    chunks = []
-    for doc in docs:
-        chunks.append(
-            {
-                "text": doc.page_content,
-                "metadata": {"source_id": source_id, "user_id": user_id},
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+from typing import Iterable, Iterator
+
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.document import DocumentStream
+from docling.document_converter import DocumentConverter
+from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+from docling_core.transforms.chunker.tokenizer.huggingface import HuggingFaceTokenizer
+from docling_core.types.doc import DoclingDocument
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+# chunks follow the document's own structure: a chunk never straddles a
+# heading, tables and list items stay whole where they fit, and sizes are
+# measured in tokens of the configured tokenizer rather than characters
+
+
+@lru_cache(maxsize=1)
+def get_chunker() -> HybridChunker:
+    tokenizer = HuggingFaceTokenizer.from_pretrained(
+        model_name=app_config.chunk_tokenizer_model,
+        max_tokens=app_config.chunk_max_tokens,
+    )
+    return HybridChunker(tokenizer=tokenizer, merge_peers=True)
+
+
+@lru_cache(maxsize=1)
+def _markdown_converter() -> DocumentConverter:
+    # markdown only, so it never loads the pdf layout models
+    return DocumentConverter(allowed_formats=[InputFormat.MD])
+
+
+def markdown_to_document(mdtext: str, name: str = "note.md") -> DoclingDocument:
+    stream = DocumentStream(name=name, stream=BytesIO(mdtext.encode()))
+    return _markdown_converter().convert(stream).document
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def stream_chunks(
+    documents: DoclingDocument | Iterable[DoclingDocument],
+    source_id: str,
+    user_id: str,
+) -> Iterator[dict]:
+    """Yield chunk dicts lazily from one document or a stream of documents.
+
+    Page-range parts of a large document can be fed in as they finish
+    converting, so downstream stages start on the first part's chunks
+    while later parts are still being extracted.
+    """
+    if isinstance(documents, DoclingDocument):
+        documents = [documents]
+    chunker = get_chunker()
+    tokenizer = chunker.tokenizer
+    for document in documents:
+        for chunk in chunker.chunk(dl_doc=document):
+            text = chunker.contextualize(chunk=chunk)
+            if not text.strip():
+                continue
+            yield {
+                "text": text,
+                "content_hash": chunk_hash(text),
+                "metadata": {
+                    "source_id": source_id,
+                    "user_id": user_id,
+                    "headings": chunk.meta.headings or [],
+                    "tokens": tokenizer.count_tokens(text),
+                },
             }
-        )
-    return chunks
+
+
+def stream_markdown_chunks(
+    mdtext: str, source_id: str, user_id: str
+) -> Iterator[dict]:
+    if not mdtext.strip():
+        return iter(())
+    return stream_chunks(markdown_to_document(mdtext), source_id, user_id)
+
+
+def chunk_md(mdtext: str, source_id: str, user_id: str) -> list[dict]:
+    return list(stream_markdown_chunks(mdtext, source_id, user_id))
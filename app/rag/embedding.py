@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Protocol
+
+import httpx
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+from google.genai import errors, types
+
+from app.config.app_config import getAppConfig
+from app.metrics import Counter, Histogram
+
+app_config = getAppConfig()
+
+DOCUMENT_TASK = "RETRIEVAL_DOCUMENT"
+QUERY_TASK = "RETRIEVAL_QUERY"
+
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "embedding_cache_requests_total",
+    "Embedding cache lookups per text by result",
+    ("result",),
+)
+EMBEDDING_BATCHES = Counter(
+    "embedding_batches_total", "Embedding requests sent to the backend", ("model",)
+)
+EMBEDDING_RETRIES = Counter(
+    "embedding_retries_total",
+    "Embedding requests retried after a transient error",
+    ("model",),
+)
+EMBEDDING_BATCH_LATENCY = Histogram(
+    "embedding_batch_duration_seconds",
+    "Latency of one embedding backend request",
+    ("model",),
+)
+
+
+class EmbeddingBackend(Protocol):
+    name: str
+    model: str
+    dimensions: int | None
+
+    async def embed(self, texts: list[str], task_type: str) -> list[list[float]]: ...
+
+    def is_retryable(self, exc: Exception) -> bool: ...
+
+
+class GeminiEmbeddingBackend:
+    name = "gemini"
+
+    def __init__(self, client, model: str, dimensions: int | None = None):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+
+    async def embed(self, texts: list[str], task_type: str) -> list[list[float]]:
+        result = await self.client.aio.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=types.EmbedContentConfig(
+                task_type=task_type, output_dimensionality=self.dimensions
+            ),
+        )
+        embeddings = [list(e.values or []) for e in result.embeddings or []]
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"expected {len(texts)} embeddings, got {len(embeddings)}"
+            )
+        return embeddings
+
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, errors.APIError):
+            return exc.code == 429 or exc.code >= 500
+        return isinstance(exc, httpx.TransportError)
+
+
+class FakeEmbeddingBackend:
+    """Deterministic offline backend: unit vectors seeded from the text."""
+
+    name = "fake"
+
+    def __init__(self, dimensions: int, latency: float = 0.0):
+        self.model = f"fake-{dimensions}"
+        self.dimensions = dimensions
+        self.latency = latency
+
+    async def embed(self, texts: list[str], task_type: str) -> list[list[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        embeddings = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+            vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+            embeddings.append((vector / np.linalg.norm(vector)).tolist())
+        return embeddings
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return False
+
+
+class RedisEmbeddingCache:
+    def __init__(self, url: str, ttl: int = 0):
+        self.client = aioredis.Redis.from_url(url)
+        self.ttl = ttl
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return await self.client.mget(keys)
+
+    async def set_many(self, values: dict[str, bytes]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, value, ex=self.ttl or None)
+        await pipe.execute()
+
+
+class MemoryEmbeddingCache:
+    def __init__(self):
+        self._values: dict[str, bytes] = {}
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return [self._values.get(key) for key in keys]
+
+    async def set_many(self, values: dict[str, bytes]) -> None:
+        self._values.update(values)
+
+
+def _pack(vector: list[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _unpack(raw: bytes) -> list[float]:
+    return np.frombuffer(raw, dtype=np.float32).tolist()
+
+
+class EmbeddingService:
+    """Embeds texts through a backend with batching, caching and retries.
+
+    Texts are looked up in the cache by a hash of backend, model, output
+    dimensions, task type and text, so duplicates within a call or across
+    reprocessed sources are embedded once. Misses are packed into batches
+    bounded by item count and total characters and sent at most
+    ``max_concurrency`` at a time.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        cache: RedisEmbeddingCache | MemoryEmbeddingCache | None = None,
+        batch_size: int = 100,
+        batch_max_chars: int = 200_000,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.batch_max_chars = batch_max_chars
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def cache_key(self, text: str, task_type: str) -> str:
+        # vectors of another length must never come back after a dimension
+        # change, they would not fit the vector(N) column
+        backend = self.backend
+        parts = (backend.name, backend.model, str(backend.dimensions), task_type, text)
+        digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+        return f"emb:{digest}"
+
+    def _batches(self, texts: list[str]) -> list[list[str]]:
+        batches: list[list[str]] = []
+        current: list[str] = []
+        chars = 0
+        for text in texts:
+            if current and (
+                len(current) >= self.batch_size
+                or chars + len(text) > self.batch_max_chars
+            ):
+                batches.append(current)
+                current, chars = [], 0
+            current.append(text)
+            chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_batch(self, texts: list[str], task_type: str) -> list[list[float]]:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                EMBEDDING_BATCHES.inc(model=self.backend.model)
+                start = time.perf_counter()
+                try:
+                    return await self.backend.embed(texts, task_type)
+                except Exception as e:
+                    if attempt >= self.max_retries or not self.backend.is_retryable(e):
+                        raise
+                finally:
+                    EMBEDDING_BATCH_LATENCY.observe(
+                        time.perf_counter() - start, model=self.backend.model
+                    )
+            # back off outside the semaphore so other batches keep going
+            attempt += 1
+            EMBEDDING_RETRIES.inc(model=self.backend.model)
+            await asyncio.sleep(min(2**attempt, 30) * (0.5 + random.random() / 2))
+
+    async def _cache_get(self, keys: list[str]) -> list[bytes | None]:
+        if self.cache is None:
+            return [None] * len(keys)
+        try:
+            return await self.cache.get_many(keys)
+        except redis.RedisError as e:
+            print(f"embedding cache read failed: {e}")
+            return [None] * len(keys)
+
+    async def _cache_set(self, values: dict[str, bytes]) -> None:
+        if self.cache is None or not values:
+            return
+        try:
+            await self.cache.set_many(values)
+        except redis.RedisError as e:
+            print(f"embedding cache write failed: {e}")
+
+    async def embed(
+        self, texts: list[str], task_type: str = DOCUMENT_TASK
+    ) -> list[list[float]]:
+        if not texts:
+            return []
+        keys = [self.cache_key(text, task_type) for text in texts]
+        unique = dict(zip(keys, texts))
+        unique_keys = list(unique)
+
+        vectors: dict[str, list[float]] = {}
+        for key, raw in zip(unique_keys, await self._cache_get(unique_keys)):
+            if raw is not None:
+                vectors[key] = _unpack(raw)
+        EMBEDDING_CACHE_REQUESTS.inc(len(vectors), result="hit")
+        EMBEDDING_CACHE_REQUESTS.inc(len(unique_keys) - len(vectors), result="miss")
+
+        missing = [key for key in unique_keys if key not in vectors]
+        batches = self._batches([unique[key] for key in missing])
+        results = await asyncio.gather(
+            *(self._embed_batch(batch, task_type) for batch in batches)
+        )
+        fresh = dict(zip(missing, (v for batch in results for v in batch)))
+        vectors.update(fresh)
+        await self._cache_set({key: _pack(vector) for key, vector in fresh.items()})
+        return [vectors[key] for key in keys]
+
+
+def _make_backend() -> EmbeddingBackend:
+    if app_config.embedding_backend == "fake":
+        return FakeEmbeddingBackend(app_config.embedding_dimensions)
+    from app.config.gemini_config import client
+
+    return GeminiEmbeddingBackend(
+        client, app_config.gemini_embedding_model, app_config.embedding_dimensions
+    )
+
+
+def _make_cache() -> RedisEmbeddingCache | MemoryEmbeddingCache:
+    url = app_config.embedding_cache_url or app_config.redis_url
+    if url.startswith("memory://"):
+        return MemoryEmbeddingCache()
+    return RedisEmbeddingCache(url, app_config.embedding_cache_ttl)
+
+
+def build_embedding_service() -> EmbeddingService:
+    return EmbeddingService(
+        _make_backend(),
+        _make_cache(),
+        batch_size=app_config.embedding_batch_size,
+        batch_max_chars=app_config.embedding_batch_max_chars,
+        max_concurrency=app_config.embedding_concurrency,
+        max_retries=app_config.embedding_max_retries,
+    )
+
+
+# async clients and semaphores belong to the loop that created them, so keep
+# one service per running loop
+_services: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingService]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_embedding_service() -> EmbeddingService:
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        service = _services[loop] = build_embedding_service()
+    return service
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_loop_lock = threading.Lock()
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    # celery workers are sync; give each process one long lived loop so the
+    # service's connections and cache survive across tasks
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(
+                target=_loop.run_forever, name="embedding-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run_in_worker_loop(coro):
+    """Run ``coro`` to completion on this process's long lived loop."""
+    return asyncio.run_coroutine_threadsafe(coro, _worker_loop()).result()
+
+
+async def _embed(texts: list[str], task_type: str) -> list[list[float]]:
+    return await get_embedding_service().embed(texts, task_type)
+
+
+def embed_texts(texts: list[str], task_type: str = DOCUMENT_TASK) -> list[list[float]]:
+    return run_in_worker_loop(_embed(texts, task_type))
@@ -0,0 +1,524 @@
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from app.rag.vector_store import (
+    ChunkHit,
+    content_hash,
+    diff_chunks,
+    require_embeddings,
+)
+from app.rag.versions import bump_chunk_versions
+
+# an in-process alternative to pgvector for deployments without the extension
+# and for tests. Each user gets a directory of append-only files:
+#
+#   vectors.f32  row-major float32, unit length, memory mapped for search
+#   rows.jsonl   one json line per vector: chunk id, source, text, metadata
+#   alive.u8     one byte per row, 0 once tombstoned
+#   centroids.npy / lists.i32  optional IVF partitioning of the rows
+#
+# writers take an exclusive flock on the directory, readers a shared one, so
+# a celery worker appending while the api searches never sees a torn row
+
+SEARCH_BLOCK_ROWS = 65536
+IVF_TRAIN_SAMPLE = 50_000
+IVF_TRAIN_ITERATIONS = 10
+IVF_MIN_ROWS_PER_LIST = 40
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    # one consistent view of the index files; replaced whole, never mutated,
+    # so a search keeps using the arrays it started with
+    signature: tuple | None
+    vectors: np.ndarray
+    rows: list[dict]
+    rows_offset: int
+    alive: np.ndarray
+    centroids: np.ndarray | None
+    lists: np.ndarray
+
+
+def _empty_snapshot(dimensions: int, signature: tuple | None = None) -> _Snapshot:
+    return _Snapshot(
+        signature=signature,
+        vectors=np.empty((0, dimensions), dtype=np.float32),
+        rows=[],
+        rows_offset=0,
+        alive=np.empty(0, dtype=np.uint8),
+        centroids=None,
+        lists=np.empty(0, dtype=np.int32),
+    )
+
+
+class UserIndex:
+    def __init__(
+        self,
+        path: Path,
+        dimensions: int,
+        ivf_lists: int = 0,
+        ivf_probe: int = 8,
+        compact_ratio: float = 0.3,
+    ):
+        self.path = path
+        self.dimensions = dimensions
+        self.ivf_lists = ivf_lists
+        self.ivf_probe = ivf_probe
+        self.compact_ratio = compact_ratio
+        self.path.mkdir(parents=True, exist_ok=True)
+        # the flock only keeps processes apart; threads of one process
+        # sharing this index (the retriever runs keyword and vector search
+        # at once) serialize reloads on this lock
+        self._state_lock = threading.Lock()
+        self._state = _empty_snapshot(dimensions)
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    @contextmanager
+    def _locked(self, mode: int):
+        # flock favours readers: back to back searches can keep an append
+        # waiting indefinitely. Every caller passes through the gate first and
+        # holds it only until it has the index lock, so readers arriving
+        # while a writer waits queue behind it.
+        with (
+            open(self._file(".gate"), "w") as gate,
+            open(self._file(".lock"), "w") as lock_file,
+        ):
+            fcntl.flock(gate, fcntl.LOCK_EX)
+            try:
+                fcntl.flock(lock_file, mode)
+            finally:
+                fcntl.flock(gate, fcntl.LOCK_UN)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat(self, name: str) -> tuple:
+        try:
+            st = os.stat(self._file(name))
+        except FileNotFoundError:
+            return (0, 0, 0)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self) -> _Snapshot:
+        # cheap when nothing changed; the rows file is only re-read after an
+        # append or a compaction. Callers must hold the flock.
+        with self._state_lock:
+            state = self._state
+            signature = tuple(
+                self._stat(name)
+                for name in ("vectors.f32", "rows.jsonl", "alive.u8", "centroids.npy")
+            )
+            if signature == state.signature:
+                return state
+            count = signature[0][1] // (4 * self.dimensions)
+            if not count:
+                self._state = _empty_snapshot(self.dimensions, signature)
+                return self._state
+            vectors = np.memmap(
+                self._file("vectors.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(count, self.dimensions),
+            )
+            rows, rows_offset = state.rows, state.rows_offset
+            if state.signature is None or signature[1][0] != state.signature[1][0]:
+                rows, rows_offset = [], 0
+            if len(rows) < count:
+                with open(self._file("rows.jsonl"), "rb") as f:
+                    f.seek(rows_offset)
+                    data = f.read()
+                rows_offset += len(data)
+                # a new list: the previous snapshot may still be in use
+                rows = rows + [json.loads(line) for line in data.splitlines()]
+            centroids = None
+            lists = np.empty(0, dtype=np.int32)
+            if signature[3][1]:
+                centroids = np.load(self._file("centroids.npy"))
+                lists = np.fromfile(self._file("lists.i32"), dtype=np.int32)
+            self._state = _Snapshot(
+                signature=signature,
+                vectors=vectors,
+                rows=rows,
+                rows_offset=rows_offset,
+                alive=np.fromfile(self._file("alive.u8"), dtype=np.uint8),
+                centroids=centroids,
+                lists=lists,
+            )
+            return self._state
+
+    def _reset(self) -> None:
+        # after a compaction rewrote the files under the same names
+        with self._state_lock:
+            self._state = replace(self._state, signature=None)
+
+    def __len__(self) -> int:
+        with self._locked(fcntl.LOCK_SH):
+            return int(self._load().alive.sum())
+
+    def append(self, rows: list[dict], vectors: np.ndarray) -> None:
+        if not rows:
+            return
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._locked(fcntl.LOCK_EX):
+            state = self._load()
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file("rows.jsonl"), "ab") as f:
+                f.write(b"".join(json.dumps(row).encode() + b"\n" for row in rows))
+            with open(self._file("alive.u8"), "ab") as f:
+                f.write(b"\x01" * len(rows))
+            if state.centroids is not None:
+                lists = np.argmax(vectors @ state.centroids.T, axis=1).astype(np.int32)
+                with open(self._file("lists.i32"), "ab") as f:
+                    f.write(lists.tobytes())
+            state = self._load()
+            if state.centroids is None and self._should_train(state):
+                self._train_ivf(state)
+
+    def live_rows(self, source_id: str) -> list[dict]:
+        with self._locked(fcntl.LOCK_SH):
+            state = self._load()
+            return [
+                row
+                for i, row in enumerate(state.rows)
+                if row["source_id"] == source_id and state.alive[i]
+            ]
+
+    def live_entries(self, source_id: str) -> tuple[list[dict], np.ndarray]:
+        """The source's live rows and a copy of their vectors."""
+        with self._locked(fcntl.LOCK_SH):
+            state = self._load()
+            keep = [
+                i
+                for i, row in enumerate(state.rows)
+                if row["source_id"] == source_id and state.alive[i]
+            ]
+            return [state.rows[i] for i in keep], np.array(state.vectors[keep])
+
+    def tombstone(self, source_id: str, chunk_ids: set[str] | None = None) -> int:
+        with self._locked(fcntl.LOCK_EX):
+            state = self._load()
+            dead = [
+                i
+                for i, row in enumerate(state.rows)
+                if row["source_id"] == source_id
+                and state.alive[i]
+                and (chunk_ids is None or row["chunk_id"] in chunk_ids)
+            ]
+            if dead:
+                alive = state.alive.copy()
+                alive[dead] = 0
+                self._replace_file("alive.u8", alive.tobytes())
+                state = self._load()
+                if len(state.alive) and 1 - state.alive.mean() > self.compact_ratio:
+                    self._compact(state)
+            return len(dead)
+
+    def compact(self) -> None:
+        with self._locked(fcntl.LOCK_EX):
+            self._compact(self._load())
+
+    def _replace_file(self, name: str, data: bytes) -> None:
+        tmp = self._file(f"{name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self._file(name))
+
+    def _compact(self, state: _Snapshot) -> None:
+        # rewrite only live rows; readers holding the old memmap keep the old
+        # inode until they reload
+        keep = np.flatnonzero(state.alive)
+        tmp = self._file("vectors.f32.tmp")
+        with open(tmp, "wb") as f:
+            for start in range(0, len(keep), SEARCH_BLOCK_ROWS):
+                f.write(state.vectors[keep[start : start + SEARCH_BLOCK_ROWS]].tobytes())
+        os.replace(tmp, self._file("vectors.f32"))
+        self._replace_file(
+            "rows.jsonl",
+            b"".join(json.dumps(state.rows[i]).encode() + b"\n" for i in keep),
+        )
+        self._replace_file("alive.u8", b"\x01" * len(keep))
+        self._drop_ivf()
+        self._reset()
+        state = self._load()
+        if self._should_train(state):
+            self._train_ivf(state)
+
+    def _drop_ivf(self) -> None:
+        for name in ("centroids.npy", "lists.i32"):
+            self._file(name).unlink(missing_ok=True)
+
+    def _should_train(self, state: _Snapshot) -> bool:
+        return (
+            self.ivf_lists > 0
+            and int(state.alive.sum()) >= self.ivf_lists * IVF_MIN_ROWS_PER_LIST
+        )
+
+    def _train_ivf(self, state: _Snapshot) -> None:
+        # spherical k-means on a sample of live rows, then assign every row
+        live = np.flatnonzero(state.alive)
+        rng = np.random.default_rng(0)
+        sample = state.vectors[
+            np.sort(rng.choice(live, min(len(live), IVF_TRAIN_SAMPLE), replace=False))
+        ]
+        centroids = sample[rng.choice(len(sample), self.ivf_lists, replace=False)]
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            assigned = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, sample)
+            empty = ~np.bincount(assigned, minlength=self.ivf_lists).astype(bool)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        lists = np.concatenate(
+            [
+                np.argmax(state.vectors[i : i + SEARCH_BLOCK_ROWS] @ centroids.T, axis=1)
+                for i in range(0, len(state.vectors), SEARCH_BLOCK_ROWS)
+            ]
+        ).astype(np.int32)
+        self._replace_file("lists.i32", lists.tobytes())
+        tmp = self._file("centroids.tmp.npy")
+        np.save(tmp, centroids.astype(np.float32))
+        os.replace(tmp, self._file("centroids.npy"))
+        self._load()
+
+    def _candidates(
+        self, state: _Snapshot, query: np.ndarray, source_ids: set[str] | None
+    ) -> np.ndarray | None:
+        mask = state.alive.astype(bool)
+        if source_ids:
+            mask &= np.fromiter(
+                (row["source_id"] in source_ids for row in state.rows),
+                dtype=bool,
+                count=len(state.rows),
+            )
+        if state.centroids is not None:
+            probe = _top_k(state.centroids @ query, self.ivf_probe)
+            mask &= np.isin(state.lists, probe)
+        elif not source_ids and mask.all():
+            return None
+        return np.flatnonzero(mask)
+
+    def search(
+        self, embedding: list[float], k: int, source_ids: set[str] | None = None
+    ) -> list[tuple[dict, float]]:
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        with self._locked(fcntl.LOCK_SH):
+            state = self._load()
+            if not len(state.vectors):
+                return []
+            candidates = self._candidates(state, query, source_ids)
+            best_idx = np.empty(0, dtype=np.int64)
+            best_scores = np.empty(0, dtype=np.float32)
+            total = len(state.vectors) if candidates is None else len(candidates)
+            # score in blocks so a 1M row index never materializes 3GB at once
+            for start in range(0, total, SEARCH_BLOCK_ROWS):
+                if candidates is None:
+                    idx = np.arange(start, min(start + SEARCH_BLOCK_ROWS, total))
+                    block = state.vectors[start : start + SEARCH_BLOCK_ROWS]
+                else:
+                    idx = candidates[start : start + SEARCH_BLOCK_ROWS]
+                    block = state.vectors[idx]
+                scores = block @ query
+                merged_idx = np.concatenate([best_idx, idx])
+                merged_scores = np.concatenate([best_scores, scores])
+                top = _top_k(merged_scores, k)
+                best_idx, best_scores = merged_idx[top], merged_scores[top]
+            return [(state.rows[i], float(s)) for i, s in zip(best_idx, best_scores)]
+
+    def keyword_search(
+        self, query: str, k: int, source_ids: set[str] | None = None
+    ) -> list[tuple[dict, float]]:
+        # bm25 without length normalisation; enough for local deployments
+        terms = set(_TOKEN.findall(query.lower()))
+        if not terms:
+            return []
+        with self._locked(fcntl.LOCK_SH):
+            state = self._load()
+            live = [
+                row
+                for i, row in enumerate(state.rows)
+                if state.alive[i] and (not source_ids or row["source_id"] in source_ids)
+            ]
+        counts = [Counter(_TOKEN.findall(row["text"].lower())) for row in live]
+        document_frequency = {t: sum(1 for c in counts if t in c) for t in terms}
+        scored = []
+        for row, tf in zip(live, counts):
+            score = sum(
+                math.log(1 + len(live) / document_frequency[t]) * tf[t] / (tf[t] + 1.2)
+                for t in terms
+                if tf[t]
+            )
+            if score > 0:
+                scored.append((row, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+
+class MmapVectorStore:
+    """``VectorStore`` over per-user memory mapped indexes under ``root``."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        dimensions: int,
+        ivf_lists: int = 0,
+        ivf_probe: int = 8,
+        compact_ratio: float = 0.3,
+    ):
+        self.root = Path(root)
+        self.dimensions = dimensions
+        self.ivf_lists = ivf_lists
+        self.ivf_probe = ivf_probe
+        self.compact_ratio = compact_ratio
+        self._indexes: dict[str, UserIndex] = {}
+        self._lock = threading.Lock()
+
+    def index_for(self, user_id: str) -> UserIndex:
+        user_id = str(uuid.UUID(str(user_id)))
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = UserIndex(
+                    self.root / user_id,
+                    self.dimensions,
+                    self.ivf_lists,
+                    self.ivf_probe,
+                    self.compact_ratio,
+                )
+            return index
+
+    def _append(self, index: UserIndex, source_id: str, chunks: list[tuple[int, dict]]):
+        rows = [
+            {
+                "chunk_id": str(uuid.uuid4()),
+                "source_id": str(source_id),
+                "chunk_index": i,
+                "text": chunk["text"],
+                "content_hash": content_hash(chunk),
+                "metadata": chunk.get("metadata") or {},
+            }
+            for i, chunk in chunks
+        ]
+        vectors = np.array(
+            [chunk.get("embedding") or [0.0] * self.dimensions for _, chunk in chunks],
+            dtype=np.float32,
+        ).reshape(len(chunks), self.dimensions)
+        index.append(rows, vectors)
+
+    def replace_source(self, source_id: str, user_id: str, chunks: list[dict]) -> int:
+        index = self.index_for(user_id)
+        index.tombstone(str(source_id))
+        self._append(index, source_id, list(enumerate(chunks)))
+        bump_chunk_versions(user_id, [source_id])
+        return len(chunks)
+
+    def insert_chunks(
+        self, source_id: str, user_id: str, chunks: list[tuple[int, dict]]
+    ) -> int:
+        self._append(self.index_for(user_id), source_id, chunks)
+        bump_chunk_versions(user_id, [source_id])
+        return len(chunks)
+
+    def existing_hashes(self, source_id: str, user_id: str) -> Counter[str]:
+        rows = self.index_for(user_id).live_rows(str(source_id))
+        return Counter(content_hash(row) for row in rows)
+
+    def sync_source(
+        self, source_id: str, user_id: str, chunks: list[dict]
+    ) -> tuple[int, int]:
+        # rows are append-only, so kept chunks keep the chunk_index they were
+        # written with; only inserts and tombstones happen here
+        index = self.index_for(user_id)
+        existing = [
+            (row["chunk_id"], content_hash(row), row["chunk_index"])
+            for row in index.live_rows(str(source_id))
+        ]
+        added, _, stale = diff_chunks(existing, chunks)
+        require_embeddings(source_id, added)
+        if stale:
+            index.tombstone(str(source_id), set(stale))
+        self._append(index, source_id, added)
+        if added or stale:
+            bump_chunk_versions(user_id, [source_id])
+        return len(added), len(stale)
+
+    def clone_source(
+        self, from_source_id: str, from_user_id: str, source_id: str, user_id: str
+    ) -> int:
+        rows, vectors = self.index_for(from_user_id).live_entries(str(from_source_id))
+        self.index_for(user_id).append(
+            [
+                {**row, "chunk_id": str(uuid.uuid4()), "source_id": str(source_id)}
+                for row in rows
+            ],
+            vectors,
+        )
+        bump_chunk_versions(user_id, [source_id])
+        return len(rows)
+
+    def delete_source(self, source_id: str, user_id: str) -> int:
+        removed = self.index_for(user_id).tombstone(str(source_id))
+        bump_chunk_versions(user_id, [source_id])
+        return removed
+
+    def search(
+        self,
+        user_id: str,
+        embedding: list[float],
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]:
+        found = self.index_for(user_id).search(embedding, k, _id_set(source_ids))
+        return [_hit(row, score) for row, score in found]
+
+    def keyword_search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]:
+        found = self.index_for(user_id).keyword_search(query, k, _id_set(source_ids))
+        return [_hit(row, score) for row, score in found]
+
+
+def _id_set(source_ids: list[str] | None) -> set[str] | None:
+    return {str(source_id) for source_id in source_ids} if source_ids else None
+
+
+def _hit(row: dict, score: float) -> ChunkHit:
+    return ChunkHit(
+        chunk_id=uuid.UUID(row["chunk_id"]),
+        source_id=uuid.UUID(row["source_id"]),
+        chunk_index=row["chunk_index"],
+        text=row["text"],
+        score=score,
+        metadata=row["metadata"],
+    )
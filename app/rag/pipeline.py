@@ -0,0 +1,339 @@
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Callable, Iterable
+
+from app.config.app_config import getAppConfig
+from app.metrics import Counter
+
+app_config = getAppConfig()
+
+PIPELINE_STAGE_SECONDS = Counter(
+    "ingest_pipeline_stage_seconds_total",
+    "Worker time per pipeline stage, split into busy/blocked/starved",
+    ("stage", "state"),
+)
+PIPELINE_STAGE_ITEMS = Counter(
+    "ingest_pipeline_stage_items_total",
+    "Items emitted by each pipeline stage",
+    ("stage",),
+)
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One step of a ``Pipeline``.
+
+    ``fn`` may be sync (run in a worker thread) or async. With ``flat`` it
+    returns an iterable whose items are passed on one by one as they are
+    produced; with ``batch_size`` > 1 it receives a list of up to that many
+    items and returns a list of results.
+    """
+
+    name: str
+    fn: Callable
+    concurrency: int = 1
+    batch_size: int = 1
+    batch_wait: float = 0.05
+    flat: bool = False
+
+
+@dataclass
+class StageStats:
+    name: str
+    concurrency: int
+    items_in: int = 0
+    items_out: int = 0
+    # summed over the stage's workers
+    busy: float = 0.0
+    blocked: float = 0.0
+    starved: float = 0.0
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def wall(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def summary(self) -> str:
+        return (
+            f"{self.name:<10} in={self.items_in:<6} out={self.items_out:<6} "
+            f"busy={self.busy:7.2f}s blocked={self.blocked:7.2f}s "
+            f"starved={self.starved:7.2f}s wall={self.wall:7.2f}s "
+            f"x{self.concurrency}"
+        )
+
+
+@dataclass
+class PipelineResult:
+    outputs: list
+    elapsed: float
+    stats: list[StageStats] = field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [stats.summary() for stats in self.stats]
+        lines.append(f"{'total':<10} {self.elapsed:.2f}s")
+        return "\n".join(lines)
+
+
+async def _call(fn: Callable, arg):
+    if inspect.iscoroutinefunction(fn):
+        return await fn(arg)
+    return await asyncio.to_thread(fn, arg)
+
+
+async def _iterate(result):
+    # pull generators item by item so a lazy producer is paced by the queue
+    # downstream instead of being drained up front
+    if hasattr(result, "__aiter__"):
+        async for item in result:
+            yield item
+        return
+    iterator = await asyncio.to_thread(iter, result)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+class Pipeline:
+    """Stages connected by bounded queues, all running at once.
+
+    Each stage runs ``concurrency`` workers. A full queue blocks the stage
+    feeding it, so a slow stage throttles everything upstream instead of
+    letting work pile up in memory, and with the stages overlapped the
+    end-to-end time tends towards that of the slowest stage.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = 64):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    async def run(
+        self, source: Iterable | AsyncIterable, collect: bool = False
+    ) -> PipelineResult:
+        queues = [asyncio.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        stats = [StageStats(stage.name, stage.concurrency) for stage in self.stages]
+        remaining = [stage.concurrency for stage in self.stages]
+        outputs: list = []
+        started = time.perf_counter()
+
+        async def feed() -> None:
+            consumers = self.stages[0].concurrency
+            if hasattr(source, "__aiter__"):
+                async for item in source:
+                    await queues[0].put(item)
+            else:
+                for item in source:
+                    await queues[0].put(item)
+            for _ in range(consumers):
+                await queues[0].put(_DONE)
+
+        async def take(i: int, stage: Stage) -> tuple[list, bool]:
+            # one item, or up to batch_size items arriving within batch_wait;
+            # the flag says this worker saw its end-of-stream sentinel
+            wait_start = time.perf_counter()
+            item = await queues[i].get()
+            stats[i].starved += time.perf_counter() - wait_start
+            if item is _DONE:
+                return [], True
+            batch = [item]
+            if stage.batch_size <= 1:
+                return batch, False
+            deadline = time.perf_counter() + stage.batch_wait
+            while len(batch) < stage.batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queues[i].get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    return batch, True
+                batch.append(item)
+            return batch, False
+
+        async def emit(i: int, item) -> None:
+            stats[i].items_out += 1
+            PIPELINE_STAGE_ITEMS.inc(stage=self.stages[i].name)
+            start = time.perf_counter()
+            await queues[i + 1].put(item)
+            stats[i].blocked += time.perf_counter() - start
+
+        async def work(i: int, stage: Stage) -> None:
+            if stats[i].started is None:
+                stats[i].started = time.perf_counter()
+            done = False
+            while not done:
+                batch, done = await take(i, stage)
+                if not batch:
+                    continue
+                stats[i].items_in += len(batch)
+                start = time.perf_counter()
+                result = await _call(stage.fn, batch if stage.batch_size > 1 else batch[0])
+                if stage.flat or stage.batch_size > 1:
+                    async for item in _iterate(result):
+                        stats[i].busy += time.perf_counter() - start
+                        await emit(i, item)
+                        start = time.perf_counter()
+                    stats[i].busy += time.perf_counter() - start
+                else:
+                    stats[i].busy += time.perf_counter() - start
+                    await emit(i, result)
+            remaining[i] -= 1
+            if remaining[i] == 0:
+                stats[i].finished = time.perf_counter()
+                consumers = (
+                    self.stages[i + 1].concurrency if i + 1 < len(self.stages) else 1
+                )
+                for _ in range(consumers):
+                    await queues[i + 1].put(_DONE)
+
+        async def sink() -> None:
+            while True:
+                item = await queues[-1].get()
+                if item is _DONE:
+                    return
+                if collect:
+                    outputs.append(item)
+
+        tasks = [asyncio.create_task(feed()), asyncio.create_task(sink())]
+        for i, stage in enumerate(self.stages):
+            tasks.extend(
+                asyncio.create_task(work(i, stage)) for _ in range(stage.concurrency)
+            )
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for stage_stats in stats:
+            PIPELINE_STAGE_SECONDS.inc(stage_stats.busy, stage=stage_stats.name, state="busy")
+            PIPELINE_STAGE_SECONDS.inc(
+                stage_stats.blocked, stage=stage_stats.name, state="blocked"
+            )
+            PIPELINE_STAGE_SECONDS.inc(
+                stage_stats.starved, stage=stage_stats.name, state="starved"
+            )
+        return PipelineResult(outputs, time.perf_counter() - started, stats)
+
+
+# chunks from page window w get provisional indexes w * WINDOW_STRIDE + j so
+# windows converted out of order still sort correctly; the final sync
+# renumbers them 0..n-1
+WINDOW_STRIDE = 1_000_000
+
+
+@dataclass
+class IngestOutcome:
+    markdown: str
+    added: int
+    removed: int
+    result: PipelineResult
+
+
+async def ingest_source(ctx: dict) -> IngestOutcome:
+    """Extract, chunk, embed and store one source with all stages overlapped.
+
+    Documents are converted in windows of ``pipeline_page_window`` pages so
+    chunking and embedding start on the first pages while later ones are
+    still converting. Chunks already stored for the source (same content
+    hash, counted per copy) are not embedded or written again.
+    """
+    from app.extractor.documents import convert_document, merge_markdown_parts, page_windows
+    from app.rag.chuncking import markdown_to_document, stream_chunks
+    from app.rag.embedding import get_embedding_service
+    from app.rag.vector_store import get_vector_store, unstored_chunks
+
+    source_id, user_id = ctx["source_id"], ctx["user_id"]
+    store = get_vector_store()
+    stored = await asyncio.to_thread(store.existing_hashes, source_id, user_id)
+    service = get_embedding_service()
+    markdown_parts: dict[int, str] = {}
+    chunks: list[tuple[int, dict]] = []
+
+    if ctx["source_type"] == "documents":
+        windows = await asyncio.to_thread(
+            page_windows, ctx["source_url"], app_config.pipeline_page_window
+        )
+        work = list(enumerate(windows or [None]))
+
+        def convert(item):
+            window_index, window = item
+            document = convert_document(ctx["source_url"], window)
+            markdown_parts[window_index] = document.export_to_markdown()
+            return window_index, document
+
+    else:
+        from app.backgroundjob.tasks.audiojob import extract_audio
+        from app.backgroundjob.tasks.youtubejob import extract_youtube
+
+        work = [(0, None)]
+
+        def convert(item):
+            extract = extract_audio if ctx["source_type"] == "audio" else extract_youtube
+            markdown_parts[0] = extract(ctx)
+            return 0, markdown_to_document(markdown_parts[0])
+
+    def chunk(item):
+        window_index, document = item
+
+        def entries():
+            for j, piece in enumerate(stream_chunks(document, source_id, user_id)):
+                entry = (window_index * WINDOW_STRIDE + j, piece)
+                chunks.append(entry)
+                yield entry
+
+        # ``stored`` is shared by all windows, so each stored copy of a
+        # repeated text covers exactly one new occurrence
+        return unstored_chunks(entries(), stored)
+
+    async def embed(batch):
+        vectors = await service.embed([piece["text"] for _, piece in batch])
+        for (_, piece), vector in zip(batch, vectors):
+            piece["embedding"] = vector
+        return batch
+
+    def write(batch):
+        store.insert_chunks(source_id, user_id, batch)
+        for _, piece in batch:
+            # the final sync only needs text and hash
+            piece.pop("embedding", None)
+        return [len(batch)]
+
+    pipeline = Pipeline(
+        [
+            Stage("convert", convert, concurrency=app_config.pipeline_convert_concurrency),
+            Stage("chunk", chunk, flat=True),
+            Stage(
+                "embed",
+                embed,
+                concurrency=app_config.embedding_concurrency,
+                batch_size=app_config.embedding_batch_size,
+            ),
+            Stage("store", write, batch_size=app_config.pipeline_store_batch_size),
+        ],
+        queue_size=app_config.pipeline_queue_size,
+    )
+    result = await pipeline.run(work)
+
+    ordered = [piece for _, piece in sorted(chunks, key=lambda entry: entry[0])]
+    # everything new was written by the store stage, so this only drops
+    # chunks the new version no longer has and renumbers the rest; the
+    # pieces carry no embeddings, so sync_source raises if anything would
+    # still need inserting
+    _, removed = await asyncio.to_thread(store.sync_source, source_id, user_id, ordered)
+    markdown = merge_markdown_parts([markdown_parts[i] for i in sorted(markdown_parts)])
+    return IngestOutcome(markdown, result.stats[-1].items_in, removed, result)
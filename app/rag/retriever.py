@@ -0,0 +1,148 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+
+from app.config.app_config import getAppConfig
+from app.metrics import Counter, Histogram
+from app.rag.embedding import QUERY_TASK, get_embedding_service
+from app.rag.vector_store import ChunkHit, VectorStore, get_vector_store
+
+app_config = getAppConfig()
+
+RRF_K = 60
+
+RETRIEVAL_STAGE_LATENCY = Histogram(
+    "retrieval_stage_duration_seconds",
+    "Latency of each hybrid retrieval sub-query",
+    ("stage",),
+)
+QUERY_EMBEDDING_CACHE = Counter(
+    "retrieval_query_embedding_cache_total",
+    "In-process query embedding cache lookups",
+    ("result",),
+)
+
+
+@dataclass
+class Retrieval:
+    hits: list[ChunkHit]
+    # seconds spent per sub-query, keyed by stage name
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[ChunkHit]], k: int = RRF_K
+) -> list[ChunkHit]:
+    scores: dict = {}
+    hits: dict = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit.chunk_id] = scores.get(hit.chunk_id, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(hit.chunk_id, hit)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [replace(hits[chunk_id], score=scores[chunk_id]) for chunk_id in ordered]
+
+
+class HybridRetriever:
+    """Full-text and vector search over one user's chunks, fused with RRF.
+
+    Both sub-queries fetch ``candidates`` rows and run concurrently in worker
+    threads; raising ``candidates`` trades latency for recall. Query
+    embeddings are kept in a small LRU in front of the embedding service's
+    own persistent cache, so repeated questions skip the network entirely.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        candidates: int = 40,
+        query_cache_size: int = 1024,
+    ):
+        self.store = store
+        self.candidates = candidates
+        self.query_cache_size = query_cache_size
+        self._query_embeddings: OrderedDict[str, list[float]] = OrderedDict()
+
+    async def embed_query(self, query: str) -> list[float]:
+        key = normalize_query(query)
+        cached = self._query_embeddings.get(key)
+        if cached is not None:
+            self._query_embeddings.move_to_end(key)
+            QUERY_EMBEDDING_CACHE.inc(result="hit")
+            return cached
+        QUERY_EMBEDDING_CACHE.inc(result="miss")
+        [embedding] = await get_embedding_service().embed([key], QUERY_TASK)
+        if self.query_cache_size > 0:
+            self._query_embeddings[key] = embedding
+            while len(self._query_embeddings) > self.query_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    async def _timed(self, stage: str, timings: dict, fn, *args):
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            timings[stage] = time.perf_counter() - start
+            RETRIEVAL_STAGE_LATENCY.observe(timings[stage], stage=stage)
+
+    async def _vector(self, user_id, query, source_ids, timings) -> list[ChunkHit]:
+        start = time.perf_counter()
+        embedding = await self.embed_query(query)
+        timings["embed"] = time.perf_counter() - start
+        RETRIEVAL_STAGE_LATENCY.observe(timings["embed"], stage="embed")
+        return await self._timed(
+            "vector",
+            timings,
+            self.store.search,
+            user_id,
+            embedding,
+            self.candidates,
+            source_ids,
+        )
+
+    async def retrieve(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> Retrieval:
+        timings: dict[str, float] = {}
+        start = time.perf_counter()
+        keyword_hits, vector_hits = await asyncio.gather(
+            self._timed(
+                "fts",
+                timings,
+                self.store.keyword_search,
+                user_id,
+                query,
+                self.candidates,
+                source_ids,
+            ),
+            self._vector(user_id, query, source_ids, timings),
+        )
+        hits = reciprocal_rank_fusion([keyword_hits, vector_hits])[:k]
+        timings["total"] = time.perf_counter() - start
+        RETRIEVAL_STAGE_LATENCY.observe(timings["total"], stage="total")
+        return Retrieval(hits=hits, timings=timings)
+
+
+_retriever: HybridRetriever | None = None
+
+
+def get_retriever() -> HybridRetriever:
+    global _retriever
+    if _retriever is None:
+        _retriever = HybridRetriever(
+            get_vector_store(),
+            candidates=app_config.retrieval_candidates,
+            query_cache_size=app_config.retrieval_query_cache_size,
+        )
+    return _retriever
@@ -0,0 +1,82 @@
+import uuid
+
+from sqlalchemy import delete, insert, select, update
+
+from app.database.db import SessionLocal
+from app.database.schema.staged_chunk_schema import StagedChunks
+from app.rag.vector_store import content_hash
+
+# the staged ingestion chain keeps a job's chunks here between stages instead
+# of shipping them (and after the embed stage, a vector per chunk) through
+# the broker; see app/backgroundjob/tasks/ingestjob.py
+
+
+def stage_chunks(job_id: str, chunks: list[dict]) -> int:
+    """Replace the job's staged chunks with ``chunks``, in order."""
+    job = uuid.UUID(job_id)
+    with SessionLocal() as db:
+        # a retried chunk stage starts over
+        db.execute(delete(StagedChunks).where(StagedChunks.job_id == job))
+        if chunks:
+            db.execute(
+                insert(StagedChunks),
+                [
+                    {
+                        "job_id": job,
+                        "chunk_index": index,
+                        "text": chunk["text"],
+                        "content_hash": content_hash(chunk),
+                        "meta": chunk.get("metadata") or {},
+                    }
+                    for index, chunk in enumerate(chunks)
+                ],
+            )
+        db.commit()
+    return len(chunks)
+
+
+def load_staged(job_id: str, embeddings: bool = False) -> list[dict]:
+    """The job's staged chunks in order, each with its ``staged_id``."""
+    columns = [
+        StagedChunks.id,
+        StagedChunks.text,
+        StagedChunks.content_hash,
+        StagedChunks.meta,
+    ]
+    if embeddings:
+        columns.append(StagedChunks.embedding)
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(*columns)
+            .where(StagedChunks.job_id == uuid.UUID(job_id))
+            .order_by(StagedChunks.chunk_index)
+        ).all()
+    chunks = []
+    for row in rows:
+        chunk = {
+            "staged_id": row.id,
+            "text": row.text,
+            "content_hash": row.content_hash,
+            "metadata": row.meta,
+        }
+        if embeddings and row.embedding is not None:
+            chunk["embedding"] = row.embedding.tolist()
+        chunks.append(chunk)
+    return chunks
+
+
+def save_embeddings(chunks: list[dict]) -> None:
+    if not chunks:
+        return
+    with SessionLocal() as db:
+        db.execute(
+            update(StagedChunks),
+            [{"id": chunk["staged_id"], "embedding": chunk["embedding"]} for chunk in chunks],
+        )
+        db.commit()
+
+
+def clear_staged(job_id: str) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(StagedChunks).where(StagedChunks.job_id == uuid.UUID(job_id)))
+        db.commit()
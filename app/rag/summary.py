@@ -0,0 +1,17 @@
+from app.config.app_config import getAppConfig
+from app.config.gemini_config import client
+
+app_config = getAppConfig()
+
+SUMMARY_PROMPT = (
+    "Summarize the following study material as concise markdown notes. "
+    "Keep the key definitions, facts and conclusions."
+)
+
+
+def summarize_markdown(markdown: str) -> str:
+    response = client.models.generate_content(
+        model=app_config.gemini_model,
+        contents=[SUMMARY_PROMPT, markdown],
+    )
+    return response.text or ""
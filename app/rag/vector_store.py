@@ -0,0 +1,393 @@
+import hashlib
+import io
+import json
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Protocol
+
+from sqlalchemy import delete, func, insert, literal, select, text, update
+
+from app.config.app_config import getAppConfig
+from app.database.db import SessionLocal
+from app.database.schema.chunk_schema import Chunks
+from app.rag.versions import bump_chunk_versions
+
+app_config = getAppConfig()
+
+COPY_CHUNKS = (
+    "COPY chunks (id, source_id, user_id, chunk_index, text, content_hash,"
+    " metadata, embedding, created_at) FROM STDIN"
+)
+
+
+@dataclass
+class ChunkHit:
+    chunk_id: uuid.UUID
+    source_id: uuid.UUID
+    chunk_index: int
+    text: str
+    score: float
+    metadata: dict = field(default_factory=dict)
+
+
+class VectorStore(Protocol):
+    def replace_source(
+        self, source_id: str, user_id: str, chunks: list[dict]
+    ) -> int: ...
+
+    def sync_source(
+        self, source_id: str, user_id: str, chunks: list[dict]
+    ) -> tuple[int, int]: ...
+
+    def existing_hashes(self, source_id: str, user_id: str) -> Counter[str]: ...
+
+    def insert_chunks(
+        self, source_id: str, user_id: str, chunks: list[tuple[int, dict]]
+    ) -> int: ...
+
+    def clone_source(
+        self, from_source_id: str, from_user_id: str, source_id: str, user_id: str
+    ) -> int: ...
+
+    def delete_source(self, source_id: str, user_id: str) -> int: ...
+
+    def search(
+        self,
+        user_id: str,
+        embedding: list[float],
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]: ...
+
+    def keyword_search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]: ...
+
+
+def _copy_field(value) -> str:
+    # postgres COPY text format: \N is null, backslash escapes the rest
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _vector_literal(embedding: list[float] | None) -> str | None:
+    if embedding is None:
+        return None
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def content_hash(chunk: dict) -> str:
+    return chunk.get("content_hash") or hashlib.sha256(chunk["text"].encode()).hexdigest()
+
+
+def diff_chunks(
+    existing: list[tuple], chunks: list[dict]
+) -> tuple[list[tuple[int, dict]], list[tuple], list]:
+    """Match a new chunk list against stored ``(id, content_hash, index)`` rows.
+
+    Returns the chunks that need inserting (with their new index), the kept
+    rows whose position moved as ``(id, new_index)``, and the ids of stored
+    rows no longer present. Repeated texts are matched one to one.
+    """
+    by_hash: dict[str, list[tuple]] = {}
+    for row in existing:
+        by_hash.setdefault(row[1], []).append(row)
+    added: list[tuple[int, dict]] = []
+    moved: list[tuple] = []
+    for index, chunk in enumerate(chunks):
+        rows = by_hash.get(content_hash(chunk))
+        if rows:
+            row = rows.pop(0)
+            if row[2] != index:
+                moved.append((row[0], index))
+        else:
+            added.append((index, chunk))
+    stale = [row[0] for rows in by_hash.values() for row in rows]
+    return added, moved, stale
+
+
+def unstored_chunks(
+    chunks: Iterable[tuple[int, dict]], stored: Counter[str]
+) -> Iterator[tuple[int, dict]]:
+    """Yield the ``(index, chunk)`` pairs ``diff_chunks`` will report as added.
+
+    ``stored`` counts the source's stored hashes. A text repeated more often
+    than it is stored yields its extra copies, matching the one to one
+    pairing of ``diff_chunks``. Matched copies are taken out of ``stored``,
+    so one counter can be shared by calls over parts of the same source.
+    """
+    for index, chunk in chunks:
+        key = content_hash(chunk)
+        if stored[key] > 0:
+            stored[key] -= 1
+        else:
+            yield index, chunk
+
+
+def require_embeddings(source_id: str, added: list[tuple[int, dict]]) -> None:
+    # a row written without its vector can never be found by vector search
+    missing = [index for index, chunk in added if chunk.get("embedding") is None]
+    if missing:
+        raise ValueError(
+            f"source {source_id}: {len(missing)} new chunks have no embedding"
+            f" (first at index {missing[0]})"
+        )
+
+
+class PgVectorStore:
+    """Chunk store backed by the ``chunks`` table and its HNSW index.
+
+    Writes go through one COPY per source instead of per-row ORM inserts.
+    Every read filters on ``user_id``; with ``hnsw.iterative_scan`` the index
+    keeps walking until enough of the tenant's rows are found rather than
+    returning a short, mostly filtered-out candidate list.
+    """
+
+    def __init__(self, session_factory=SessionLocal, ef_search: int = 100):
+        self.session_factory = session_factory
+        self.ef_search = ef_search
+
+    def _copy(self, db, source_id: str, user_id: str, chunks: list[tuple[int, dict]]):
+        if not chunks:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        buffer = io.StringIO()
+        for index, chunk in chunks:
+            row = (
+                uuid.uuid4(),
+                source_id,
+                user_id,
+                index,
+                chunk["text"],
+                content_hash(chunk),
+                json.dumps(chunk.get("metadata") or {}),
+                _vector_literal(chunk.get("embedding")),
+                now,
+            )
+            buffer.write("\t".join(_copy_field(v) for v in row) + "\n")
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(COPY_CHUNKS, buffer)
+        finally:
+            cursor.close()
+
+    def replace_source(self, source_id: str, user_id: str, chunks: list[dict]) -> int:
+        with self.session_factory() as db:
+            # reprocessing a source replaces its previous chunk set
+            db.execute(
+                delete(Chunks).where(
+                    Chunks.source_id == uuid.UUID(source_id),
+                    Chunks.user_id == uuid.UUID(user_id),
+                )
+            )
+            self._copy(db, source_id, user_id, list(enumerate(chunks)))
+            db.commit()
+        bump_chunk_versions(user_id, [source_id])
+        return len(chunks)
+
+    def insert_chunks(
+        self, source_id: str, user_id: str, chunks: list[tuple[int, dict]]
+    ) -> int:
+        # append (index, chunk) pairs without touching the source's other rows
+        with self.session_factory() as db:
+            self._copy(db, source_id, user_id, chunks)
+            db.commit()
+        bump_chunk_versions(user_id, [source_id])
+        return len(chunks)
+
+    def existing_hashes(self, source_id: str, user_id: str) -> Counter[str]:
+        with self.session_factory() as db:
+            return Counter(
+                db.scalars(
+                    select(Chunks.content_hash).where(
+                        Chunks.source_id == uuid.UUID(source_id),
+                        Chunks.user_id == uuid.UUID(user_id),
+                        Chunks.content_hash.is_not(None),
+                    )
+                )
+            )
+
+    def sync_source(
+        self, source_id: str, user_id: str, chunks: list[dict]
+    ) -> tuple[int, int]:
+        """Bring a source's stored chunks in line with ``chunks``.
+
+        Only chunks without a stored copy are written and they must carry
+        their embedding, otherwise nothing is changed and ``ValueError`` is
+        raised. Stale rows are deleted and kept rows re-numbered. Returns
+        ``(added, removed)``.
+        """
+        with self.session_factory() as db:
+            existing = db.execute(
+                select(Chunks.id, Chunks.content_hash, Chunks.chunk_index)
+                .where(
+                    Chunks.source_id == uuid.UUID(source_id),
+                    Chunks.user_id == uuid.UUID(user_id),
+                )
+                .with_for_update()
+            ).all()
+            added, moved, stale = diff_chunks(existing, chunks)
+            require_embeddings(source_id, added)
+            if stale:
+                db.execute(delete(Chunks).where(Chunks.id.in_(stale)))
+            if moved:
+                db.execute(
+                    update(Chunks),
+                    [{"id": chunk_id, "chunk_index": index} for chunk_id, index in moved],
+                )
+            self._copy(db, source_id, user_id, added)
+            db.commit()
+        if added or stale or moved:
+            bump_chunk_versions(user_id, [source_id])
+        return len(added), len(stale)
+
+    def clone_source(
+        self, from_source_id: str, from_user_id: str, source_id: str, user_id: str
+    ) -> int:
+        # deduplicated uploads copy the canonical source's rows server side;
+        # the embeddings never leave postgres
+        with self.session_factory() as db:
+            result = db.execute(
+                insert(Chunks).from_select(
+                    [
+                        "id",
+                        "source_id",
+                        "user_id",
+                        "chunk_index",
+                        "text",
+                        "content_hash",
+                        "metadata",
+                        "embedding",
+                        "created_at",
+                    ],
+                    select(
+                        func.gen_random_uuid(),
+                        literal(uuid.UUID(source_id), Chunks.source_id.type),
+                        literal(uuid.UUID(user_id), Chunks.user_id.type),
+                        Chunks.chunk_index,
+                        Chunks.text,
+                        Chunks.content_hash,
+                        Chunks.meta,
+                        Chunks.embedding,
+                        func.now(),
+                    ).where(
+                        Chunks.source_id == uuid.UUID(from_source_id),
+                        Chunks.user_id == uuid.UUID(from_user_id),
+                    ),
+                )
+            )
+            db.commit()
+        bump_chunk_versions(user_id, [source_id])
+        return result.rowcount
+
+    def delete_source(self, source_id: str, user_id: str) -> int:
+        with self.session_factory() as db:
+            result = db.execute(
+                delete(Chunks).where(
+                    Chunks.source_id == uuid.UUID(source_id),
+                    Chunks.user_id == uuid.UUID(user_id),
+                )
+            )
+            db.commit()
+        bump_chunk_versions(user_id, [source_id])
+        return result.rowcount
+
+    def search(
+        self,
+        user_id: str,
+        embedding: list[float],
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]:
+        distance = Chunks.embedding.cosine_distance(embedding)
+        stmt = (
+            self._scoped(user_id, source_ids, distance)
+            .where(Chunks.embedding.is_not(None))
+            .order_by(distance)
+            .limit(k)
+        )
+        with self.session_factory() as db:
+            db.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.ef_search)}"))
+            db.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+            rows = db.execute(stmt).all()
+        return [_hit(row, 1.0 - row.score) for row in rows]
+
+    def keyword_search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 8,
+        source_ids: list[str] | None = None,
+    ) -> list[ChunkHit]:
+        tsquery = func.websearch_to_tsquery("english", query)
+        rank = func.ts_rank_cd(Chunks.search_vector, tsquery)
+        stmt = (
+            self._scoped(user_id, source_ids, rank)
+            .where(Chunks.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc())
+            .limit(k)
+        )
+        with self.session_factory() as db:
+            rows = db.execute(stmt).all()
+        return [_hit(row, row.score) for row in rows]
+
+    def _scoped(self, user_id: str, source_ids: list[str] | None, score):
+        stmt = select(
+            Chunks.id,
+            Chunks.source_id,
+            Chunks.chunk_index,
+            Chunks.text,
+            Chunks.meta,
+            score.label("score"),
+        ).where(Chunks.user_id == uuid.UUID(str(user_id)))
+        if source_ids:
+            stmt = stmt.where(
+                Chunks.source_id.in_([uuid.UUID(str(s)) for s in source_ids])
+            )
+        return stmt
+
+
+def _hit(row, score: float) -> ChunkHit:
+    return ChunkHit(
+        chunk_id=row.id,
+        source_id=row.source_id,
+        chunk_index=row.chunk_index,
+        text=row.text,
+        score=float(score),
+        metadata=row.meta or {},
+    )
+
+
+_store: VectorStore | None = None
+
+
+def get_vector_store() -> VectorStore:
+    global _store
+    if _store is None:
+        if app_config.vector_backend == "mmap":
+            from app.rag.mmap_index import MmapVectorStore
+
+            _store = MmapVectorStore(
+                app_config.vector_index_dir,
+                app_config.embedding_dimensions,
+                ivf_lists=app_config.vector_ivf_lists,
+                ivf_probe=app_config.vector_ivf_probe,
+                compact_ratio=app_config.vector_compact_ratio,
+            )
+        else:
+            _store = PgVectorStore(ef_search=app_config.vector_ef_search)
+    return _store
@@ -0,0 +1,85 @@
+import threading
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config.app_config import getAppConfig
+
+app_config = getAppConfig()
+
+# monotonically increasing counters bumped on every chunk write, per user and
+# per source. Anything derived from a user's chunks (cached chat answers)
+# records the versions it was built from and is stale once they move.
+
+
+def user_version_key(user_id) -> str:
+    return f"chunk-version:user:{user_id}"
+
+
+def source_version_key(source_id) -> str:
+    return f"chunk-version:source:{source_id}"
+
+
+def version_keys(user_id, source_ids: list[str] | None = None) -> list[str]:
+    # answers over all of a user's notes depend on the user-wide counter,
+    # answers scoped to sources only on those sources
+    if source_ids:
+        return [source_version_key(source_id) for source_id in sorted(source_ids)]
+    return [user_version_key(user_id)]
+
+
+class _MemoryVersions:
+    def __init__(self):
+        self._values: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, keys: list[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._values[key] = self._values.get(key, 0) + 1
+
+    def get(self, keys: list[str]) -> list[int]:
+        with self._lock:
+            return [self._values.get(key, 0) for key in keys]
+
+
+_url = app_config.chunk_versions_url or app_config.redis_url
+_memory = _MemoryVersions() if _url.startswith("memory://") else None
+_sync_client: redis.Redis | None = None
+_async_client: aioredis.Redis | None = None
+
+
+def bump_chunk_versions(user_id, source_ids: list) -> None:
+    keys = [user_version_key(user_id)] + [source_version_key(s) for s in source_ids]
+    if _memory is not None:
+        _memory.bump(keys)
+        return
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(_url)
+    try:
+        pipe = _sync_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"failed to bump chunk versions for {user_id}: {e}")
+
+
+def _get_async_client() -> aioredis.Redis:
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis.from_url(_url)
+    return _async_client
+
+
+async def current_versions(keys: list[str]) -> tuple[int, ...] | None:
+    """Current counters for ``keys``, or None when they cannot be read."""
+    if _memory is not None:
+        return tuple(_memory.get(keys))
+    try:
+        values = await _get_async_client().mget(keys)
+    except redis.RedisError as e:
+        print(f"failed to read chunk versions: {e}")
+        return None
+    return tuple(int(value or 0) for value in values)
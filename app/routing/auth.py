@@ -3,22 +3,24 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
-from firebase_admin.auth import verify_id_token
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from user_agents import parse
 
-from app.database.db import get_db
+from app.database.db import get_async_db, get_db
 from app.database.schema.user_schema import AuthProvider, Users
+from app.firebase_auth import InvalidIdTokenError, firebase_verifier
 from app.helper import (
     create_token,
     get_current_user,
-    hash_password,
     verify_access_token,
-    verify_hash_password,
     verify_refresh_token,
 )
 from app.models.auth_model import GoogleAuth, RefreshTokenBody, SignIn, Signup
+from app.passwords import HashingBusyError, hash_password_async, verify_password_async
+from app.profile_cache import get_user_profile
 
 router = APIRouter(prefix="/auth")
 
@@ -29,9 +31,13 @@ def auth():
 
 
 @router.post("/signup")
-def signup(request: Request, body: Signup, db: Annotated[Session, Depends(get_db)]):
+async def signup(
+    request: Request,
+    body: Signup,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+):
     try:
-        existingUser = db.query(Users).filter(Users.email == body.email).first()
+        existingUser = await db.scalar(select(Users).where(Users.email == body.email))
         if existingUser:
             return JSONResponse(
                 {"message": "User email is already exits"},
@@ -41,13 +47,13 @@ def signup(request: Request, body: Signup, db: Annotated[Session, Depends(get_db
         # user_agent = parse(user_agent_str)
         new_user = Users(
             email=body.email,
-            password=hash_password(body.password),
+            password=await hash_password_async(body.password),
             auth_provider=AuthProvider.EMAIL,
             user_device=user_agent_str,
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         tokens = create_token(str(new_user.id))
         return JSONResponse(
             content={
@@ -63,8 +69,13 @@ def signup(request: Request, body: Signup, db: Annotated[Session, Depends(get_db
             },
             status_code=status.HTTP_201_CREATED,
         )
+    except HashingBusyError:
+        return JSONResponse(
+            {"message": "Server busy, please retry"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         print(f"error in signup_db: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -81,15 +92,15 @@ def signup(request: Request, body: Signup, db: Annotated[Session, Depends(get_db
 
 
 @router.post("/login")
-def login(body: SignIn, db: Annotated[Session, Depends(get_db)]):
+async def login(body: SignIn, db: Annotated[AsyncSession, Depends(get_async_db)]):
     try:
-        existingUser = db.query(Users).filter(Users.email == body.email).first()
+        existingUser = await db.scalar(select(Users).where(Users.email == body.email))
         if not existingUser:
             return JSONResponse(
                 {"message": "User not found with this email"},
                 status_code=status.HTTP_404_NOT_FOUND,
             )
-        isValidPassword = verify_hash_password(
+        isValidPassword, rehashed = await verify_password_async(
             body.password, str(existingUser.password)
         )
         if not isValidPassword:
@@ -97,6 +108,10 @@ def login(body: SignIn, db: Annotated[Session, Depends(get_db)]):
                 {"message": "Invalid email or password"},
                 status_code=status.HTTP_401_UNAUTHORIZED,
             )
+        if rehashed:
+            # stored with older argon2 parameters, upgrade while we have it
+            existingUser.password = rehashed
+            await db.commit()
 
         tokens = create_token(str(existingUser.id))
         return JSONResponse(
@@ -114,6 +129,11 @@ def login(body: SignIn, db: Annotated[Session, Depends(get_db)]):
             },
             status_code=status.HTTP_200_OK,
         )
+    except HashingBusyError:
+        return JSONResponse(
+            {"message": "Server busy, please retry"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
     except Exception as e:
         print(f"error in login: {e}")
         return JSONResponse(
@@ -125,35 +145,40 @@ def login(body: SignIn, db: Annotated[Session, Depends(get_db)]):
 
 
 @router.post("/google")
-def google_auth(body: GoogleAuth, db: Annotated[Session, Depends(get_db)]):
+async def google_auth(
+    body: GoogleAuth, db: Annotated[AsyncSession, Depends(get_async_db)]
+):
     try:
-        payload_from_firebase = verify_id_token(body.idToken)
-        print(
-            f"firebase user data: {payload_from_firebase}",
-        )
+        payload_from_firebase = await firebase_verifier.verify(body.idToken)
         email = payload_from_firebase.get("email")
         if not email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email not available from Google account",
             )
-        user = db.query(Users).filter(Users.email == email).first()
+        user = await db.scalar(select(Users).where(Users.email == email))
         if not user:
             user = Users(
                 email=email,
                 google_id=payload_from_firebase["uid"],
-                auth_provider="google",
+                auth_provider=AuthProvider.GOOGLE,
                 profile_img=payload_from_firebase.get("picture"),
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         tokens = create_token(str(user.id))
         return JSONResponse(
             {"message": "Google login successful", "token": tokens.model_dump()},
             status_code=status.HTTP_200_OK,
         )
 
+    except InvalidIdTokenError as e:
+        print(f"invalid firebase id token: {e}")
+        return JSONResponse(
+            {"message": "Invalid Google token"},
+            status_code=status.HTTP_401_UNAUTHORIZED,
+        )
     except Exception as e:
         print(f"error in google_auth: {e}")
         return JSONResponse(
@@ -192,11 +217,11 @@ def refresh_token(body: RefreshTokenBody, db: Annotated[Session, Depends(get_db)
 @router.get("/me")
 async def me(
     user_id: Annotated[str, Depends(get_current_user)],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
 ):
     try:
-        user = db.query(Users).filter(Users.id == user_id).first()
-        if not user:
+        profile = await get_user_profile(db, user_id)
+        if profile is None:
             return JSONResponse(
                 {
                     "message": "no user found",
@@ -204,21 +229,10 @@ async def me(
                 status_code=status.HTTP_404_NOT_FOUND,
             )
 
-        print(f"user:= {user.id, user.email}")
         return JSONResponse(
             {
                 "message": "user data",
-                "user": {
-                    "user_id": str(user.id),
-                    "email": user.email,
-                    "auth_provider": user.auth_provider.value,
-                    "plan": user.plan.value,
-                    "google_id": user.google_id,
-                    "profile_img": user.profile_img,
-                    "is_active": user.is_active,
-                    "user_agent":user.user_device,
-                    "created_at": user.created_at.isoformat(),
-                },
+                "user": profile,
             },
             status_code=status.HTTP_200_OK,
         )
@@ -0,0 +1,41 @@
+import json
+import uuid
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.chat.models import ChatRequest
+from app.chat.service import CHAT_ANSWERS, get_chat_service
+from app.helper import get_current_user
+
+router = APIRouter(prefix="/chat")
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+@router.post("/")
+async def chat(
+    body: ChatRequest,
+    user_id: uuid.UUID = Depends(get_current_user),
+):
+    source_ids = [str(source_id) for source_id in body.source_ids or []] or None
+
+    async def stream():
+        try:
+            async for event in get_chat_service().answer(
+                str(user_id), body.question, source_ids
+            ):
+                yield _sse(event)
+        except Exception as e:
+            # headers are already sent, so report the failure in-band
+            print(f"chat failed: {e}")
+            CHAT_ANSWERS.inc(outcome="failed")
+            yield _sse({"type": "error", "message": "failed to answer"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
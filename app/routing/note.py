@@ -1,25 +1,68 @@
+import asyncio
+import json
 import uuid
+from dataclasses import dataclass
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
 
+from app.backgroundjob.progress import (
+    TERMINAL_STATUSES,
+    live_progress,
+    next_progress,
+    progress_subscription,
+)
 from app.backgroundjob.tasks import example_task
-from app.database.db import get_db
-from app.database.schema.job_schema import Jobs, JobStatusEnum, JobTypeEnum
+from app.backgroundjob.tasks.ingestjob import (
+    start_ingestion,
+    start_ingestions,
+    start_reindex,
+)
+from app.config.app_config import getAppConfig
+from app.database.db import AsyncSessionLocal, get_async_db
+from app.database.schema.job_schema import Jobs
+from app.database.schema.note_schema import Notes
 from app.database.schema.source_schema import Sources, SourceTypeEnum
+from app.database.sources import (
+    NewSource,
+    RegisteredSource,
+    bulk_create_sources_with_jobs,
+    clone_source_outputs,
+    create_reindex_job,
+    create_source_with_job,
+    find_source_by_hash,
+    find_sources_by_hashes,
+)
 from app.helper import (
+    FileTooLargeError,
     extract_youtube_video_id,
     get_current_user,
+    ingest_upload,
     upload_file_to_imagekit,
 )
-from app.models.notes_model import YoutubeLink
+from app.models.notes_model import NoteUpdate, YoutubeLink
+from app.rag.vector_store import get_vector_store
 
 router = APIRouter(prefix="/note")
+app_config = getAppConfig()
 
 MAX_AUDIO_FILE_SIZE = 25 * 1024 * 1024
+MAX_DOCS_FILE_SIZE = 25 * 1024 * 1024
+# whole request caps for RequestBodyLimitMiddleware, relative to the router
+# prefix; the slack covers multipart framing and the other form fields
+MULTIPART_SLACK = 64 * 1024
+UPLOAD_BODY_LIMITS = {
+    "/audio": MAX_AUDIO_FILE_SIZE + MULTIPART_SLACK,
+    "/docs": MAX_DOCS_FILE_SIZE + MULTIPART_SLACK,
+    "/batch": app_config.batch_max_items * max(MAX_AUDIO_FILE_SIZE, MAX_DOCS_FILE_SIZE)
+    + MULTIPART_SLACK,
+}
+PROGRESS_HEARTBEAT_SECONDS = 15.0
 
 
 @router.post("/")
@@ -37,11 +80,70 @@ def health(content_id: str):
         print(f"error in /: {e}")
 
 
+async def _clone_chunks(
+    canonical_id: uuid.UUID, source_id: uuid.UUID, user_id: uuid.UUID
+) -> bool:
+    # through the vector store so every backend gets the copied chunks; if
+    # that fails the caller ingests the upload from scratch instead
+    try:
+        await run_in_threadpool(
+            get_vector_store().clone_source,
+            str(canonical_id),
+            str(user_id),
+            str(source_id),
+            str(user_id),
+        )
+        return True
+    except Exception as e:
+        print(f"cloning chunks of source {canonical_id} failed: {e}")
+        return False
+
+
+async def _register_upload(
+    db: AsyncSession,
+    upload: UploadFile,
+    max_size: int,
+    source_type: SourceTypeEnum,
+    user_id: uuid.UUID,
+) -> tuple[RegisteredSource, bool]:
+    ingested = await ingest_upload(upload, max_size)
+    existing, processed = await find_source_by_hash(
+        db, user_id, ingested.content_hash, source_type
+    )
+    if existing:
+        source_url = existing.source_url
+    else:
+        # don't hold a pooled connection across the object store upload
+        await db.rollback()
+        file_upload_res = await upload_file_to_imagekit(files=upload)
+        source_url = file_upload_res.url
+    registered = await create_source_with_job(
+        db,
+        NewSource(
+            user_id=user_id,
+            source_type=source_type,
+            source_url=source_url,
+            source_name=upload.filename,
+            size=ingested.size,
+            content_hash=ingested.content_hash,
+            completed=processed,
+        ),
+    )
+    if existing and processed:
+        await clone_source_outputs(db, existing.id, registered.source_id, user_id)
+    await db.commit()
+    if existing and processed:
+        processed = await _clone_chunks(existing.id, registered.source_id, user_id)
+    if not processed:
+        await run_in_threadpool(start_ingestion, str(registered.job_id))
+    return registered, processed
+
+
 @router.post("/audio")
 async def upload_audio_file(
     audio: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    user_id: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: uuid.UUID = Depends(get_current_user),
 ):
     try:
         if not user_id:
@@ -60,46 +162,22 @@ async def upload_audio_file(
                 {"message": "Invalid file"},
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
-        contents = await audio.read()
-        if len(contents) > MAX_AUDIO_FILE_SIZE:
-            return JSONResponse(
-                {"message": "file too large"},
-                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
-            )
-
-        file_upload_res = await upload_file_to_imagekit(files=audio)
-        if len(contents) < MAX_AUDIO_FILE_SIZE:
-            return JSONResponse(
-                {"message": "file too small"},
-                status_code=status.HTTP_400_BAD_REQUEST,
-            )
-            # source data
-        sourcedata = Sources(
-            source_type=SourceTypeEnum.AUDIO,
-            source_url=file_upload_res.url,
-            source_name=audio.filename,
-            size=file_upload_res.size,
-            user_id=user_id,
+        registered, processed = await _register_upload(
+            db, audio, MAX_AUDIO_FILE_SIZE, SourceTypeEnum.AUDIO, user_id
         )
-        db.add(sourcedata)
-        db.commit()
-        db.refresh(sourcedata)
-        job = Jobs(
-            source_id=sourcedata.id,
-            job_type=JobTypeEnum.AUDIO,
-            job_status=JobStatusEnum.QUEUED,
-            progress=0,
-            current_step="queued",
-            retry_count=0,
-        )
-        db.add(job)
-        db.commit()
-        db.refresh(job)
         return JSONResponse(
-            {"message": "process queued", "job_id": job.id},
+            {
+                "message": "process queued",
+                "job_id": str(registered.job_id),
+                "deduplicated": processed,
+            },
             status_code=status.HTTP_200_OK,
         )
-        # Todo: audio file to celery
+    except FileTooLargeError:
+        return JSONResponse(
+            {"message": "file too large"},
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        )
     except Exception as e:
         print(f"file upload failed: {e}")
         return JSONResponse(
@@ -111,8 +189,8 @@ async def upload_audio_file(
 @router.post("/youtube-link")
 async def paste_youtube_link(
     link: YoutubeLink,
-    db: Session = Depends(get_db),
-    user_id: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: uuid.UUID = Depends(get_current_user),
 ):
     try:
         if not user_id:
@@ -133,30 +211,20 @@ async def paste_youtube_link(
                 {"message": "Invalid YouTube link"},
                 status_code=HTTP_400_BAD_REQUEST,
             )
-        sourcedata = Sources(
-            source_type=SourceTypeEnum.YOUTUBE,
-            source_url=link.link,
-            source_name=link.link,
-            user_id=user_id,
+        registered = await create_source_with_job(
+            db,
+            NewSource(
+                user_id=user_id,
+                source_type=SourceTypeEnum.YOUTUBE,
+                source_url=link.link,
+                source_name=link.link,
+            ),
         )
-        db.add(sourcedata)
-        db.commit()
-        db.refresh(sourcedata)
-        job = Jobs(
-            source_id=sourcedata.id,
-            job_type=JobTypeEnum.YOUTUBE,
-            job_status=JobStatusEnum.QUEUED,
-            progress=0,
-            current_step="queued",
-            retry_count=0,
-        )
-        db.add(job)
-        db.commit()
-        db.refresh(job)
-        # processing in queue
+        await db.commit()
+        await run_in_threadpool(start_ingestion, str(registered.job_id))
         return {
             "message": "YouTube link accepted",
-            "job_id": job.id,
+            "job_id": registered.job_id,
             "video_id": link.link,
         }
     except Exception as e:
@@ -169,7 +237,7 @@ async def paste_youtube_link(
 @router.post("/docs")
 async def upload_docs(
     docs: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: uuid.UUID = Depends(get_current_user),
 ):
     try:
@@ -186,32 +254,287 @@ async def upload_docs(
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
         obj_key = f"documents/{docs.filename}"
-        file_upload = await upload_file_to_imagekit(files=docs)
-        # TODO: to save in db
-        sourcedata = Sources(
-            source_type=SourceTypeEnum.DOCUMENTS,
-            source_url=file_upload.url,
-            source_name=docs.filename,
-            user_id=user_id,
+        registered, processed = await _register_upload(
+            db, docs, MAX_DOCS_FILE_SIZE, SourceTypeEnum.DOCUMENTS, user_id
         )
-        db.add(sourcedata)
-        db.commit()
-        db.refresh(sourcedata)
-        job = Jobs(
-            source_id=sourcedata.id,
-            job_type=JobTypeEnum.DOCUMENTS,
-            job_status=JobStatusEnum.QUEUED,
-            progress=0,
-            current_step="queued",
-            retry_count=0,
-        )
-        db.add(job)
-        db.commit()
-        db.refresh(job)
         return {
             "message": "docs uplpoad",
             "obj_key": obj_key,
             "file_type": docs.content_type,
+            "job_id": str(registered.job_id),
+            "deduplicated": processed,
         }
+    except FileTooLargeError:
+        return JSONResponse(
+            {"message": "file too large"},
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        )
     except Exception as e:
         print(f"failed to upload {e}")
+        return JSONResponse(
+            {"message": "failed to upload file"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@dataclass
+class _BatchItem:
+    name: str
+    source_type: SourceTypeEnum | None = None
+    upload: UploadFile | None = None
+    source_url: str | None = None
+    size: int | None = None
+    content_hash: str | None = None
+    canonical_id: uuid.UUID | None = None
+    job_id: uuid.UUID | None = None
+    error: str | None = None
+
+    def result(self) -> dict:
+        if self.error:
+            return {"name": self.name, "status": "failed", "message": self.error}
+        return {
+            "name": self.name,
+            "type": self.source_type.value if self.source_type else None,
+            "status": "deduplicated" if self.canonical_id else "queued",
+            "job_id": str(self.job_id),
+        }
+
+
+def _batch_file_item(upload: UploadFile) -> _BatchItem:
+    item = _BatchItem(name=upload.filename or "", upload=upload)
+    content_type = upload.content_type or ""
+    if content_type.startswith("audio/"):
+        item.source_type = SourceTypeEnum.AUDIO
+    elif content_type.startswith("application/"):
+        item.source_type = SourceTypeEnum.DOCUMENTS
+    else:
+        item.error = "Invalid file"
+    return item
+
+
+def _batch_link_item(link: str) -> _BatchItem:
+    link = link.strip()
+    item = _BatchItem(name=link, source_type=SourceTypeEnum.YOUTUBE, source_url=link)
+    if not (
+        link.startswith("https://youtu.be") or link.startswith("https://www.youtube.com")
+    ) or not extract_youtube_video_id(link):
+        item.error = "Invalid YouTube link"
+    return item
+
+
+@router.post("/batch")
+async def batch_ingest(
+    files: list[UploadFile] = File(default=[]),
+    links: list[str] = Form(default=[]),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: uuid.UUID = Depends(get_current_user),
+):
+    try:
+        if not files and not links:
+            return JSONResponse(
+                {"message": "files or links required"},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(files) + len(links) > app_config.batch_max_items:
+            return JSONResponse(
+                {"message": f"at most {app_config.batch_max_items} items per batch"},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        items = [_batch_file_item(f) for f in files] + [_batch_link_item(l) for l in links]
+        semaphore = asyncio.Semaphore(app_config.batch_upload_concurrency)
+
+        async def hash_item(item: _BatchItem) -> None:
+            max_size = (
+                MAX_AUDIO_FILE_SIZE
+                if item.source_type == SourceTypeEnum.AUDIO
+                else MAX_DOCS_FILE_SIZE
+            )
+            async with semaphore:
+                try:
+                    ingested = await ingest_upload(item.upload, max_size)
+                except FileTooLargeError:
+                    item.error = "file too large"
+                    return
+            item.size = ingested.size
+            item.content_hash = ingested.content_hash
+
+        await asyncio.gather(
+            *(hash_item(item) for item in items if item.upload and not item.error)
+        )
+
+        # identical files inside the batch share one upload and one lookup;
+        # only the user's own earlier uploads are reused
+        by_key: dict[tuple, list[_BatchItem]] = {}
+        for item in items:
+            if item.upload and not item.error:
+                by_key.setdefault((item.content_hash, item.source_type), []).append(item)
+        found = await find_sources_by_hashes(db, user_id, list(by_key))
+        for key, (source, processed) in found.items():
+            for item in by_key.pop(key):
+                item.source_url = source.source_url
+                item.canonical_id = source.id if processed else None
+        # don't hold a pooled connection across the object store uploads
+        await db.rollback()
+
+        async def upload_group(group: list[_BatchItem]) -> None:
+            async with semaphore:
+                try:
+                    result = await upload_file_to_imagekit(files=group[0].upload)
+                except Exception as e:
+                    print(f"batch upload of {group[0].name} failed: {e}")
+                    for item in group:
+                        item.error = "failed to upload file"
+                    return
+            for item in group:
+                item.source_url = result.url
+
+        await asyncio.gather(*(upload_group(group) for group in by_key.values()))
+
+        ready = [item for item in items if not item.error]
+        registered = await bulk_create_sources_with_jobs(
+            db,
+            [
+                NewSource(
+                    user_id=user_id,
+                    source_type=item.source_type,
+                    source_url=item.source_url,
+                    source_name=item.name,
+                    size=item.size,
+                    content_hash=item.content_hash,
+                    completed=item.canonical_id is not None,
+                )
+                for item in ready
+            ],
+        )
+        for item, reg in zip(ready, registered):
+            item.job_id = reg.job_id
+            if item.canonical_id:
+                await clone_source_outputs(db, item.canonical_id, reg.source_id, user_id)
+        await db.commit()
+        for item, reg in zip(ready, registered):
+            if item.canonical_id and not await _clone_chunks(
+                item.canonical_id, reg.source_id, user_id
+            ):
+                item.canonical_id = None
+        await run_in_threadpool(
+            start_ingestions,
+            [str(item.job_id) for item in ready if not item.canonical_id],
+        )
+        return {
+            "message": "batch accepted",
+            "items": [item.result() for item in items],
+        }
+    except Exception as e:
+        print(f"batch ingest failed: {e}")
+        return JSONResponse(
+            {"message": "failed to process batch"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@router.patch("/{note_id}")
+async def update_note(
+    note_id: uuid.UUID,
+    body: NoteUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: uuid.UUID = Depends(get_current_user),
+):
+    try:
+        note = await db.scalar(
+            select(Notes).where(Notes.id == note_id, Notes.user_id == user_id)
+        )
+        if note is None:
+            return JSONResponse(
+                {"message": "note not found"},
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+        changed = note.content != body.content
+        note.content = body.content
+        if body.title is not None:
+            note.title = body.title
+        job_id = None
+        if changed:
+            source = await db.get(Sources, note.source_id)
+            job_id = await create_reindex_job(db, source)
+        await db.commit()
+        if job_id is not None:
+            # only chunks touched by the edit get embedded again
+            await run_in_threadpool(
+                start_reindex, str(job_id), str(note.id), str(note.source_id), str(user_id)
+            )
+        return JSONResponse(
+            {
+                "message": "note updated",
+                "note_id": str(note.id),
+                "reindexing": changed,
+                "job_id": str(job_id) if job_id else None,
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except Exception as e:
+        print(f"note update failed: {e}")
+        return JSONResponse(
+            {"message": "failed to update note"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+async def _job_snapshot(job_id: uuid.UUID, user_id: uuid.UUID) -> dict | None:
+    async with AsyncSessionLocal() as db:
+        job = await db.scalar(
+            select(Jobs)
+            .join(Sources, Sources.id == Jobs.source_id)
+            .where(Jobs.id == job_id, Sources.user_id == user_id)
+        )
+        if job is None:
+            return None
+        return {
+            "job_id": str(job.id),
+            "step": job.current_step,
+            "progress": job.progress,
+            "status": job.job_status.value,
+            "error_info": job.error_info,
+        }
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: uuid.UUID,
+    user_id: uuid.UUID = Depends(get_current_user),
+):
+    if await _job_snapshot(job_id, user_id) is None:
+        return JSONResponse(
+            {"message": "job not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    async def stream():
+        async with progress_subscription(str(job_id)) as pubsub:
+            # read the state only after subscribing so no event falls in
+            # between; redis holds anything newer than the last row flush
+            snapshot = await live_progress(str(job_id))
+            if snapshot is None:
+                snapshot = await _job_snapshot(job_id, user_id)
+            if snapshot is None:
+                return
+            yield _sse(snapshot)
+            if snapshot.get("status") in TERMINAL_STATUSES:
+                return
+            while True:
+                event = await next_progress(pubsub, PROGRESS_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,75 @@
+"""Throughput and peak memory of the structure-aware chunker.
+
+    python -m benchmarks.chunker_bench --pages 1000
+
+Builds a synthetic markdown document of --pages pages (a heading, prose,
+a bullet list and a small table per page), parses it into a
+DoclingDocument and streams it through the chunker. Reports chunks per
+second, time to the first chunk and peak traced memory, next to the old
+character based MarkdownTextSplitter for reference.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from langchain_text_splitters import MarkdownTextSplitter
+
+from app.rag.chuncking import get_chunker, markdown_to_document, stream_chunks
+
+PARAGRAPH = (
+    "Gradient descent updates each parameter against the slope of the loss, "
+    "scaled by a learning rate that trades convergence speed for stability. "
+)
+
+
+def synthetic_markdown(pages: int) -> str:
+    parts = []
+    for page in range(1, pages + 1):
+        if page % 20 == 1:
+            parts.append(f"# Chapter {page // 20 + 1}\n")
+        parts.append(f"## Section {page}\n")
+        parts.append(PARAGRAPH * 12 + "\n")
+        parts.append("\n".join(f"- point {page}.{i}: {PARAGRAPH[:60]}" for i in range(5)))
+        parts.append("\n\n| term | value | note |\n|---|---|---|")
+        parts.append("\n".join(f"| t{i} | {page * i} | row {i} |" for i in range(6)))
+        parts.append("\n\n" + PARAGRAPH * 8 + "\n")
+    return "\n".join(parts)
+
+
+def _measure(label: str, run) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for _ in run():
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<22}{count:>8} chunks {count / elapsed:>9.1f}/s "
+        f"first {first or 0:>6.2f}s  peak {peak / 2**20:>7.1f} MiB"
+    )
+
+
+def main(pages: int) -> None:
+    markdown = synthetic_markdown(pages)
+    print(f"{pages} pages, {len(markdown) / 2**20:.1f} MiB of markdown")
+    get_chunker()  # load the tokenizer outside the timed runs
+
+    started = time.perf_counter()
+    document = markdown_to_document(markdown)
+    print(f"parsed into a DoclingDocument in {time.perf_counter() - started:.2f}s")
+
+    _measure("hybrid (streaming)", lambda: stream_chunks(document, "bench", "bench"))
+    splitter = MarkdownTextSplitter(chunk_size=1000, chunk_overlap=200)
+    _measure("markdown splitter", lambda: splitter.create_documents([markdown]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    main(parser.parse_args().pages)
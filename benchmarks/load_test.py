@@ -0,0 +1,78 @@
+"""Concurrent latency probe for authenticated API endpoints.
+
+Run it against a live server before and after a change, e.g.
+
+    python -m benchmarks.load_test --token "$ACCESS_TOKEN" \
+        --url http://localhost:8000/v1/api/auth/me --concurrency 200
+
+and compare the reported p50/p99. Requests that fail or run past
+``--timeout`` count as errors but their latency is still recorded, so a
+stalled server shows up as a p99 at the timeout. With the sync session a
+request waiting for a pooled connection blocks the event loop, so past
+``db_pool_size + db_max_overflow`` concurrent requests the worker stalls
+until checkouts time out; the asyncpg session waits without blocking.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(
+    url: str, token: str, concurrency: int, total: int, timeout: float
+) -> None:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(total))
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        headers=headers, limits=limits, timeout=timeout
+    ) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"url          {url}")
+    print(f"concurrency  {concurrency}")
+    print(f"requests     {len(latencies)} ({errors} errors)")
+    print(f"throughput   {len(latencies) / elapsed:.1f} req/s")
+    print(f"mean         {statistics.mean(latencies):.1f} ms")
+    for pct in (50, 90, 99):
+        print(f"p{pct:<11} {percentile(latencies, pct):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000/v1/api/auth/me")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.url, args.token, args.concurrency, args.requests, args.timeout)
+    )
@@ -0,0 +1,62 @@
+"""Argon2 login throughput through the dedicated hashing executor.
+
+    python -m benchmarks.password_hash_bench --seconds 10 --concurrency 64
+
+Reports verified logins per second overall and per executor worker (one
+worker per core by default), for the argon2 parameters in AppConfig.
+Use it to pick argon2_time_cost / argon2_memory_cost for a target login
+rate before changing them in production.
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.config.app_config import getAppConfig
+from app.passwords import (
+    HashingBusyError,
+    hash_password,
+    password_executor,
+    verify_password_async,
+)
+
+
+async def run(seconds: float, concurrency: int) -> None:
+    app_config = getAppConfig()
+    stored = hash_password("correct horse battery")
+    done = 0
+    rejected = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client() -> None:
+        nonlocal done, rejected
+        while time.perf_counter() < deadline:
+            try:
+                ok, _ = await verify_password_async("correct horse battery", stored)
+                assert ok
+                done += 1
+            except HashingBusyError:
+                rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    password_executor.shutdown()
+
+    rate = done / elapsed
+    print(
+        f"argon2 t={app_config.argon2_time_cost} m={app_config.argon2_memory_cost} "
+        f"p={app_config.argon2_parallelism}"
+    )
+    print(f"workers      {password_executor.workers}")
+    print(f"logins       {done} in {elapsed:.1f}s ({rejected} rejected as busy)")
+    print(f"logins/s     {rate:.1f}")
+    print(f"logins/s/core {rate / password_executor.workers:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.concurrency))
@@ -0,0 +1,67 @@
+"""Sequential versus overlapped ingestion with synthetic stage costs.
+
+    python -m benchmarks.pipeline_bench --windows 50 --convert 0.2 --embed 0.05
+
+Simulates a document converted in --windows page windows, each yielding
+--chunks chunks, with per-call sleeps standing in for conversion, chunking,
+embedding (per batch) and storing (per batch). Prints the sequential sum,
+the pipelined wall time and per-stage stats; the pipelined time should sit
+close to the busiest stage's total.
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.rag.pipeline import Pipeline, Stage
+
+
+def main(args) -> None:
+    def convert(window):
+        time.sleep(args.convert)
+        return window
+
+    def chunk(window):
+        for j in range(args.chunks):
+            time.sleep(args.chunk)
+            yield (window, j)
+
+    async def embed(batch):
+        await asyncio.sleep(args.embed)
+        return batch
+
+    def store(batch):
+        time.sleep(args.store)
+        return [len(batch)]
+
+    total_chunks = args.windows * args.chunks
+    batches = -(-total_chunks // args.batch)
+    sequential = (
+        args.windows * args.convert
+        + total_chunks * args.chunk
+        + batches * (args.embed + args.store)
+    )
+    pipeline = Pipeline(
+        [
+            Stage("convert", convert),
+            Stage("chunk", chunk, flat=True),
+            Stage("embed", embed, concurrency=args.embed_concurrency, batch_size=args.batch),
+            Stage("store", store, batch_size=args.batch),
+        ]
+    )
+    result = asyncio.run(pipeline.run(range(args.windows)))
+    print(f"sequential estimate {sequential:.2f}s")
+    print(result.summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--convert", type=float, default=0.2)
+    parser.add_argument("--chunk", type=float, default=0.002)
+    parser.add_argument("--embed", type=float, default=0.3)
+    parser.add_argument("--store", type=float, default=0.05)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    main(parser.parse_args())
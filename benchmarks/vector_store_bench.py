@@ -0,0 +1,160 @@
+"""Ingest and query latency of the mmap and pgvector chunk stores.
+
+    python -m benchmarks.vector_store_bench --sizes 10000 100000 1000000
+    python -m benchmarks.vector_store_bench --backends mmap --ivf-lists 1024
+
+Loads N random unit vectors for one throwaway user into each backend, then
+issues --queries searches and reports ingest rate, p50/p99 query latency
+and recall@k against exact brute force. The pgvector run needs the database
+from AppConfig with the migrations applied; its user and source rows are
+deleted afterwards. The mmap run writes under a temporary directory.
+"""
+
+import argparse
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.config.app_config import getAppConfig
+from app.rag.mmap_index import MmapVectorStore
+
+BATCH = 10_000
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+
+def _vectors(rng, n: int, dimensions: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dimensions), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _ingest(store, user_id: str, vectors: np.ndarray) -> float:
+    # one source per batch so a 1M row run does not build one giant copy
+    started = time.perf_counter()
+    for start in range(0, len(vectors), BATCH):
+        block = vectors[start : start + BATCH]
+        store.replace_source(
+            str(uuid.uuid4()),
+            user_id,
+            [
+                {"text": f"chunk {start + i}", "embedding": v.tolist()}
+                for i, v in enumerate(block)
+            ],
+        )
+    return time.perf_counter() - started
+
+
+def _query(store, user_id: str, vectors, queries, k: int) -> tuple[list[float], float]:
+    latencies = []
+    recall = 0.0
+    for query in queries:
+        started = time.perf_counter()
+        hits = store.search(user_id, query.tolist(), k)
+        latencies.append(time.perf_counter() - started)
+        exact = set(np.argsort(-(vectors @ query))[:k])
+        found = {int(hit.text.split()[1]) for hit in hits}
+        recall += len(exact & found) / k
+    return latencies, recall / len(queries)
+
+
+def _pg_fixture(user_id: uuid.UUID):
+    from sqlalchemy import delete
+
+    from app.database.db import SessionLocal
+    from app.database.schema import Sources, Users
+    from app.database.schema.user_schema import AuthProvider
+
+    with SessionLocal() as db:
+        db.add(
+            Users(
+                id=user_id,
+                email=f"bench-{user_id}@example.com",
+                auth_provider=AuthProvider.EMAIL,
+            )
+        )
+        db.commit()
+
+    def cleanup() -> None:
+        with SessionLocal() as db:
+            # chunks go with their sources through ON DELETE CASCADE
+            db.execute(delete(Sources).where(Sources.user_id == user_id))
+            db.execute(delete(Users).where(Users.id == user_id))
+            db.commit()
+
+    return cleanup
+
+
+class _PgSourceStore:
+    # chunks reference sources, so register one per replaced source first
+    def __init__(self):
+        from app.rag.vector_store import PgVectorStore
+
+        self.store = PgVectorStore(ef_search=getAppConfig().vector_ef_search)
+
+    def replace_source(self, source_id, user_id, chunks):
+        from app.database.db import SessionLocal
+        from app.database.schema import Sources
+        from app.database.schema.source_schema import SourceTypeEnum
+
+        with SessionLocal() as db:
+            db.add(
+                Sources(
+                    id=uuid.UUID(source_id),
+                    user_id=uuid.UUID(user_id),
+                    source_type=SourceTypeEnum.DOCUMENTS,
+                    source_name="vector-bench",
+                )
+            )
+            db.commit()
+        return self.store.replace_source(source_id, user_id, chunks)
+
+    def search(self, user_id, embedding, k):
+        return self.store.search(user_id, embedding, k)
+
+
+def run(args) -> None:
+    dimensions = getAppConfig().embedding_dimensions
+    rng = np.random.default_rng(7)
+    print(f"{'backend':<14}{'rows':>10}{'ingest/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'recall':>9}")
+    for size in args.sizes:
+        vectors = _vectors(rng, size, dimensions)
+        queries = _vectors(rng, args.queries, dimensions)
+        for backend in args.backends:
+            user_id = uuid.uuid4()
+            cleanup = None
+            with tempfile.TemporaryDirectory() as root:
+                if backend == "mmap":
+                    store = MmapVectorStore(
+                        root, dimensions, ivf_lists=args.ivf_lists, ivf_probe=args.ivf_probe
+                    )
+                    label = f"mmap-ivf{args.ivf_lists}" if args.ivf_lists else "mmap"
+                else:
+                    cleanup = _pg_fixture(user_id)
+                    store = _PgSourceStore()
+                    label = "pgvector"
+                try:
+                    elapsed = _ingest(store, str(user_id), vectors)
+                    latencies, recall = _query(store, str(user_id), vectors, queries, args.k)
+                finally:
+                    if cleanup is not None:
+                        cleanup()
+            print(
+                f"{label:<14}{size:>10}{size / elapsed:>12.0f}"
+                f"{_percentile(latencies, 50):>10.2f}{_percentile(latencies, 99):>10.2f}"
+                f"{recall:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["mmap", "pgvector"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=0)
+    parser.add_argument("--ivf-probe", type=int, default=8)
+    run(parser.parse_args())
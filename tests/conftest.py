@@ -0,0 +1,10 @@
+import os
+
+# app modules read their settings on import; keep the unit tests off
+# postgres, redis and gemini. The engines are created lazily, so a dummy
+# database url is enough as long as nothing queries it.
+os.environ.setdefault("DB_URL", "postgresql://test@localhost/test")
+os.environ.setdefault("CHUNK_VERSIONS_URL", "memory://")
+os.environ.setdefault("EMBEDDING_CACHE_URL", "memory://")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("CHAT_BACKEND", "fake")
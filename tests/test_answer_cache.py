@@ -0,0 +1,78 @@
+import pytest
+
+from app.chat import cache as cache_module
+from app.chat.cache import SemanticAnswerCache, scope_key
+
+QUESTION = [1.0, 0.0, 0.0]
+REPHRASED = [0.99, 0.05, 0.0]
+UNRELATED = [0.0, 1.0, 0.0]
+SOURCES = [{"ref": 1, "source_id": "s1", "chunk_index": 0, "score": 0.9}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_rephrased_question_in_the_same_scope_hits():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put("u:*", QUESTION, (1,), "answer", SOURCES)
+    hit = cache.get("u:*", REPHRASED, (1,))
+    assert hit is not None
+    assert (hit.answer, hit.sources) == ("answer", SOURCES)
+    assert cache.get("u:*", UNRELATED, (1,)) is None
+
+
+def test_closest_cached_question_wins():
+    cache = SemanticAnswerCache(threshold=0.5)
+    cache.put("u:*", [0.8, 0.6, 0.0], (1,), "farther", SOURCES)
+    cache.put("u:*", QUESTION, (1,), "closest", SOURCES)
+    assert cache.get("u:*", REPHRASED, (1,)).answer == "closest"
+
+
+def test_scopes_do_not_share_answers():
+    cache = SemanticAnswerCache()
+    cache.put(scope_key("u1", None), QUESTION, (1,), "answer", SOURCES)
+    assert cache.get(scope_key("u2", None), QUESTION, (1,)) is None
+    assert cache.get(scope_key("u1", ["s1"]), QUESTION, (1,)) is None
+
+
+def test_scope_key_ignores_source_order():
+    assert scope_key("u", ["b", "a"]) == scope_key("u", ["a", "b"])
+    assert scope_key("u", []) == scope_key("u", None)
+
+
+def test_answer_is_stale_once_the_versions_move():
+    cache = SemanticAnswerCache()
+    cache.put("u:s1", QUESTION, (3,), "answer", SOURCES)
+    assert cache.get("u:s1", QUESTION, (4,)) is None
+    # the stale entry is dropped, not kept for the old versions
+    assert cache.get("u:s1", QUESTION, (3,)) is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = SemanticAnswerCache(ttl=60)
+    cache.put("u:*", QUESTION, (1,), "answer", SOURCES)
+    clock[0] += 59
+    assert cache.get("u:*", QUESTION, (1,)) is not None
+    clock[0] += 2
+    assert cache.get("u:*", QUESTION, (1,)) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.put("a", QUESTION, (1,), "a", SOURCES)
+    cache.put("b", QUESTION, (1,), "b", SOURCES)
+    assert cache.get("a", QUESTION, (1,)) is not None
+    cache.put("c", QUESTION, (1,), "c", SOURCES)
+    assert cache.get("b", QUESTION, (1,)) is None
+    assert cache.get("a", QUESTION, (1,)).answer == "a"
+    assert cache.get("c", QUESTION, (1,)).answer == "c"
+
+
+def test_zero_size_disables_the_cache():
+    cache = SemanticAnswerCache(max_entries=0)
+    cache.put("u:*", QUESTION, (1,), "answer", SOURCES)
+    assert cache.get("u:*", QUESTION, (1,)) is None
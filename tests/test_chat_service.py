@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+
+from prometheus_client import REGISTRY
+
+from app.chat.cache import SemanticAnswerCache
+from app.chat.service import ChatService, FakeChatBackend
+from app.rag.retriever import Retrieval
+from app.rag.vector_store import ChunkHit
+from app.rag.versions import bump_chunk_versions
+
+
+class StubRetriever:
+    def __init__(self, hits: list[ChunkHit]):
+        self.hits = hits
+        self.retrievals = 0
+
+    async def embed_query(self, query: str) -> list[float]:
+        return [1.0, 0.0, 0.0]
+
+    async def retrieve(self, user_id, query, k=8, source_ids=None) -> Retrieval:
+        self.retrievals += 1
+        return Retrieval(hits=self.hits)
+
+
+def hit(source_id: uuid.UUID, text: str) -> ChunkHit:
+    return ChunkHit(uuid.uuid4(), source_id, 0, text, 0.9)
+
+
+def answer(service: ChatService, user_id: str) -> list[dict]:
+    async def collect() -> list[dict]:
+        return [event async for event in service.answer(user_id, "what is osmosis?")]
+
+    return asyncio.run(collect())
+
+
+def observed(metric: str, cached: str) -> float:
+    return REGISTRY.get_sample_value(f"{metric}_count", {"cached": cached}) or 0.0
+
+
+def make_service(retriever: StubRetriever) -> ChatService:
+    return ChatService(retriever, FakeChatBackend(), cache=SemanticAnswerCache())
+
+
+def test_cached_answers_record_ttft_under_their_own_label():
+    user_id = str(uuid.uuid4())
+    retriever = StubRetriever([hit(uuid.uuid4(), "Osmosis moves water across a membrane.")])
+    service = make_service(retriever)
+    before = {
+        cached: observed("chat_time_to_first_token_seconds", cached)
+        for cached in ("true", "false")
+    }
+
+    first = answer(service, user_id)
+    second = answer(service, user_id)
+
+    assert first[-1]["cached"] is False
+    assert second[-1]["cached"] is True
+    assert retriever.retrievals == 1
+    assert second[-1]["ttft"] <= second[-1]["elapsed"]
+    assert observed("chat_time_to_first_token_seconds", "false") == before["false"] + 1
+    assert observed("chat_time_to_first_token_seconds", "true") == before["true"] + 1
+    assert observed("chat_answer_duration_seconds", "true") >= 1
+
+
+def test_a_chunk_write_makes_the_cached_answer_stale():
+    user_id = str(uuid.uuid4())
+    retriever = StubRetriever([hit(uuid.uuid4(), "Osmosis moves water across a membrane.")])
+    service = make_service(retriever)
+
+    answer(service, user_id)
+    bump_chunk_versions(user_id, [str(uuid.uuid4())])
+    after_write = answer(service, user_id)
+
+    assert after_write[-1]["cached"] is False
+    assert retriever.retrievals == 2
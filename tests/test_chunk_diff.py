@@ -0,0 +1,62 @@
+from collections import Counter
+
+from app.rag.vector_store import content_hash, diff_chunks, unstored_chunks
+
+
+def chunk(text: str) -> dict:
+    return {"text": text}
+
+
+def stored(texts: list[str]) -> list[tuple]:
+    # (id, content_hash, chunk_index) rows as the stores read them back
+    return [(f"row-{i}", content_hash(chunk(t)), i) for i, t in enumerate(texts)]
+
+
+def test_unchanged_source_has_nothing_to_do():
+    texts = ["a", "b", "c"]
+    added, moved, stale = diff_chunks(stored(texts), [chunk(t) for t in texts])
+    assert (added, moved, stale) == ([], [], [])
+
+
+def test_moved_text_keeps_its_row():
+    added, moved, stale = diff_chunks(
+        stored(["a", "b", "c"]), [chunk(t) for t in ["c", "a", "b"]]
+    )
+    assert added == []
+    assert stale == []
+    assert sorted(moved) == [("row-0", 1), ("row-1", 2), ("row-2", 0)]
+
+
+def test_repeated_text_is_matched_one_to_one():
+    chunks = [chunk(t) for t in ["a", "x", "a", "a"]]
+    added, moved, stale = diff_chunks(stored(["a", "b"]), chunks)
+    # one stored copy of "a" covers one of the three new copies
+    assert [index for index, _ in added] == [1, 2, 3]
+    assert moved == []
+    assert stale == ["row-1"]
+
+
+def test_dropped_repeat_leaves_one_stale_row():
+    added, moved, stale = diff_chunks(
+        stored(["a", "a", "b"]), [chunk(t) for t in ["a", "b"]]
+    )
+    assert added == []
+    assert moved == [("row-2", 1)]
+    assert stale == ["row-1"]
+
+
+def test_unstored_chunks_agrees_with_diff_chunks():
+    existing = stored(["a", "b", "a", "c"])
+    chunks = [chunk(t) for t in ["a", "a", "a", "b", "d", "b"]]
+    added, _, _ = diff_chunks(existing, chunks)
+    counts = Counter(row[1] for row in existing)
+    assert list(unstored_chunks(enumerate(chunks), counts)) == added
+
+
+def test_unstored_chunks_shares_the_counter_across_calls():
+    chunks = [chunk(t) for t in ["a", "a", "b", "a"]]
+    counts = Counter({content_hash(chunk("a")): 2})
+    first = list(unstored_chunks(enumerate(chunks[:2]), counts))
+    second = list(unstored_chunks(list(enumerate(chunks))[2:], counts))
+    assert first == []
+    assert [index for index, _ in second] == [2, 3]
@@ -0,0 +1,56 @@
+import httpx
+import pytest
+import redis
+import requests
+from google.genai import errors
+
+from app.backgroundjob.tasks.ingestjob import (
+    TransientError,
+    _retry_transient,
+    embed_chunks,
+    is_transient,
+    summarize_source,
+)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        errors.ClientError(429, {}),
+        errors.ServerError(503, {}),
+        httpx.ReadTimeout("read timed out"),
+        requests.ConnectionError(),
+        redis.ConnectionError(),
+        TimeoutError(),
+    ],
+)
+def test_network_timeout_and_rate_limit_errors_are_transient(exc):
+    assert is_transient(exc)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        errors.ClientError(400, {}),
+        errors.ClientError(404, {}),
+        ValueError("expected 3 embeddings, got 2"),
+        KeyError("note_id"),
+    ],
+)
+def test_bad_input_is_not_transient(exc):
+    assert not is_transient(exc)
+
+
+def test_only_transient_errors_are_wrapped_for_autoretry():
+    with pytest.raises(TransientError) as caught:
+        with _retry_transient():
+            raise httpx.ConnectError("refused")
+    assert isinstance(caught.value.__cause__, httpx.ConnectError)
+    with pytest.raises(ValueError):
+        with _retry_transient():
+            raise ValueError("bad chunk")
+
+
+def test_tasks_autoretry_on_transient_errors_only():
+    assert embed_chunks.autoretry_for == (TransientError,)
+    assert summarize_source.autoretry_for == (TransientError,)
@@ -0,0 +1,197 @@
+import multiprocessing
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.rag.mmap_index import MmapVectorStore, UserIndex
+
+DIMENSIONS = 8
+
+
+def rows(source_id: str, count: int, start: int = 0) -> list[dict]:
+    return [
+        {
+            "chunk_id": str(uuid.uuid4()),
+            "source_id": source_id,
+            "chunk_index": start + i,
+            "text": f"chunk {start + i} of {source_id}",
+            "content_hash": f"{source_id}-{start + i}",
+            "metadata": {},
+        }
+        for i in range(count)
+    ]
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIMENSIONS))
+
+
+@pytest.fixture
+def index(tmp_path):
+    # compact_ratio 1 keeps tombstones around until a test compacts
+    return UserIndex(tmp_path, DIMENSIONS, compact_ratio=1.0)
+
+
+def test_append_then_search_finds_the_row(index):
+    data = vectors(5)
+    index.append(rows("a", 5), data)
+    assert len(index) == 5
+    [(row, score)] = index.search(data[3].tolist(), k=1)
+    assert row["chunk_index"] == 3
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_search_is_limited_to_the_asked_sources(index):
+    index.append(rows("a", 3), vectors(3, seed=1))
+    index.append(rows("b", 3), vectors(3, seed=2))
+    hits = index.search(vectors(1, seed=3)[0].tolist(), k=10, source_ids={"b"})
+    assert {row["source_id"] for row, _ in hits} == {"b"}
+
+
+def test_tombstoned_rows_are_not_returned(index):
+    written = rows("a", 4)
+    index.append(written, vectors(4))
+    assert index.tombstone("a", {written[1]["chunk_id"]}) == 1
+    assert len(index) == 3
+    assert [row["chunk_index"] for row in index.live_rows("a")] == [0, 2, 3]
+    hits = index.search(vectors(4)[1].tolist(), k=10)
+    assert written[1]["chunk_id"] not in {row["chunk_id"] for row, _ in hits}
+
+
+def test_compact_drops_dead_rows_and_keeps_vectors_aligned(index):
+    data = vectors(6)
+    index.append(rows("a", 3), data[:3])
+    index.append(rows("b", 3), data[3:])
+    index.tombstone("a")
+    index.compact()
+    assert (index.path / "alive.u8").stat().st_size == 3
+    assert len(index) == 3
+    for i in range(3):
+        [(row, score)] = index.search(data[3 + i].tolist(), k=1)
+        assert (row["source_id"], row["chunk_index"]) == ("b", i)
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_tombstones_past_the_ratio_compact_on_their_own(tmp_path):
+    index = UserIndex(tmp_path, DIMENSIONS, compact_ratio=0.3)
+    index.append(rows("a", 2) + rows("b", 8), vectors(10))
+    index.tombstone("a")
+    assert (index.path / "alive.u8").stat().st_size == 10
+    index.tombstone("b", {index.live_rows("b")[0]["chunk_id"]})
+    assert (index.path / "alive.u8").stat().st_size == 7
+
+
+def test_other_handle_sees_appends_and_compaction(index):
+    reader = UserIndex(index.path, DIMENSIONS)
+    index.append(rows("a", 2), vectors(2))
+    assert len(reader) == 2
+    index.append(rows("b", 2), vectors(2, seed=1))
+    index.tombstone("a")
+    index.compact()
+    assert [row["source_id"] for row in reader.live_rows("b")] == ["b", "b"]
+    assert len(reader) == 2
+
+
+@pytest.fixture
+def eager_thread_switching():
+    # switch threads far more often than every 5ms so that reloads
+    # interleave even though each one only reads a few short rows
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_threads_reloading_together_see_each_row_once(index, eager_thread_switching):
+    writer = UserIndex(index.path, DIMENSIONS)
+    query = np.ones(DIMENSIONS).tolist()
+    for batch in range(100):
+        writer.append(rows("a", 5, start=batch * 5), vectors(5, seed=batch))
+        start = threading.Barrier(8)
+        errors: list[BaseException] = []
+
+        def search() -> None:
+            start.wait()
+            try:
+                index.search(query, k=5, source_ids={"a"})
+            except BaseException as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=search) for _ in range(8)]
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        assert errors == []
+        assert len(index.live_rows("a")) == (batch + 1) * 5
+
+
+def _append_rows(path: str, count: int) -> None:
+    index = UserIndex(Path(path), DIMENSIONS)
+    for i in range(count):
+        index.append(rows("a", 1, start=i), vectors(1, seed=i))
+
+
+def test_concurrent_reloads_while_another_process_appends(index):
+    # the writer is a separate process, so the reader threads sharing this
+    # handle all notice the growing files and reload at the same time; the
+    # writer must also get its turn while they keep searching
+    appends = 20
+    writer = multiprocessing.get_context("spawn").Process(
+        target=_append_rows, args=(str(index.path), appends)
+    )
+    writer.start()
+    deadline = time.monotonic() + 30
+    errors: list[BaseException] = []
+    query = np.ones(DIMENSIONS).tolist()
+
+    def search() -> None:
+        while writer.is_alive() and time.monotonic() < deadline:
+            try:
+                index.search(query, k=5, source_ids={"a"})
+            except BaseException as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    writer.join(timeout=5)
+    if writer.is_alive():
+        writer.kill()
+    assert errors == []
+    assert writer.exitcode == 0, "the writer was starved by the readers"
+    assert len(index) == appends
+    assert [row["chunk_index"] for row in index.live_rows("a")] == list(range(appends))
+
+
+def test_clone_source_copies_live_rows_and_vectors(tmp_path):
+    store = MmapVectorStore(tmp_path, DIMENSIONS)
+    owner, other = str(uuid.uuid4()), str(uuid.uuid4())
+    source, copy = str(uuid.uuid4()), str(uuid.uuid4())
+    data = vectors(3)
+    written = rows(source, 3)
+    store.index_for(owner).append(written, data)
+    store.index_for(owner).tombstone(source, {written[0]["chunk_id"]})
+
+    assert store.clone_source(source, owner, copy, other) == 2
+    cloned = store.index_for(other).live_rows(copy)
+    assert [row["chunk_index"] for row in cloned] == [1, 2]
+    assert not {row["chunk_id"] for row in cloned} & {row["chunk_id"] for row in written}
+    hits = store.search(other, data[2].tolist(), k=1)
+    assert (str(hits[0].source_id), hits[0].chunk_index) == (copy, 2)
+
+
+def test_sync_source_refuses_chunks_without_embeddings(tmp_path):
+    store = MmapVectorStore(tmp_path, DIMENSIONS)
+    user, source = str(uuid.uuid4()), str(uuid.uuid4())
+    with pytest.raises(ValueError):
+        store.sync_source(source, user, [{"text": "no vector yet"}])
+    assert store.index_for(user).live_rows(source) == []
@@ -0,0 +1,95 @@
+import uuid
+
+from app.chat.prompt import MIN_OVERLAP_CHARS, assemble_context, estimate_tokens
+from app.rag.vector_store import ChunkHit
+
+SOURCE = uuid.uuid4()
+
+
+def hit(index: int, text: str, source_id: uuid.UUID = SOURCE) -> ChunkHit:
+    return ChunkHit(uuid.uuid4(), source_id, index, text, 1.0 - index / 100)
+
+
+def sentences(prefix: str, count: int) -> str:
+    return " ".join(f"{prefix} sentence number {i} says something." for i in range(count))
+
+
+def test_text_shared_with_the_previous_chunk_is_trimmed():
+    shared = "this run of words is shared by both neighbouring chunks. " * 2
+    first = "The first chunk opens here. " + shared
+    second = shared + "The second chunk carries on."
+    picked = assemble_context([hit(0, first), hit(1, second)], token_budget=1000)
+    assert [chunk.text for chunk in picked] == [first.strip(), "The second chunk carries on."]
+
+
+def test_text_shared_with_the_next_chunk_is_trimmed():
+    shared = "this run of words is shared by both neighbouring chunks. " * 2
+    first = "The first chunk opens here. " + shared
+    second = shared + "The second chunk carries on."
+    # the later chunk ranks higher, so the earlier one loses its tail
+    picked = assemble_context([hit(1, second), hit(0, first)], token_budget=1000)
+    assert [chunk.text for chunk in picked] == [second, "The first chunk opens here."]
+
+
+def test_short_overlaps_are_left_alone():
+    shared = "x" * (MIN_OVERLAP_CHARS - 1)
+    first = "The first chunk ends with " + shared
+    second = shared + " and the second starts with it."
+    picked = assemble_context([hit(0, first), hit(1, second)], token_budget=1000)
+    assert [chunk.text for chunk in picked] == [first, second]
+
+
+def test_overlap_only_counts_between_neighbours_of_one_source():
+    shared = "this run of words is shared by both neighbouring chunks. " * 2
+    picked = assemble_context(
+        [hit(0, "A " + shared), hit(2, shared + "B"), hit(1, shared + "C", uuid.uuid4())],
+        token_budget=1000,
+    )
+    assert [chunk.text for chunk in picked] == [
+        ("A " + shared).strip(),
+        shared + "B",
+        shared + "C",
+    ]
+
+
+def test_exact_duplicates_are_dropped():
+    text = sentences("duplicate", 3)
+    picked = assemble_context(
+        [hit(0, text), hit(0, text, uuid.uuid4()), hit(4, "another passage")],
+        token_budget=1000,
+    )
+    assert [chunk.text for chunk in picked] == [text, "another passage"]
+
+
+def test_chunks_are_picked_in_rank_order_until_the_budget_is_spent():
+    texts = [sentences(f"chunk{i}", 4) for i in range(10)]
+    budget = 3 * estimate_tokens(texts[0]) + 10
+    picked = assemble_context(
+        [hit(i * 2, text) for i, text in enumerate(texts)],
+        token_budget=budget,
+        min_chunk_tokens=20,
+    )
+    assert [chunk.text for chunk in picked] == texts[:3]
+    assert sum(chunk.tokens for chunk in picked) <= budget
+
+
+def test_the_last_chunk_is_cut_short_on_a_sentence_boundary():
+    texts = [sentences(f"chunk{i}", 8) for i in range(2)]
+    budget = estimate_tokens(texts[0]) + 40
+    picked = assemble_context(
+        [hit(0, texts[0]), hit(2, texts[1])], token_budget=budget, min_chunk_tokens=20
+    )
+    assert len(picked) == 2
+    assert picked[1].tokens <= 40
+    assert texts[1].startswith(picked[1].text)
+    assert picked[1].text.endswith(".")
+    assert sum(chunk.tokens for chunk in picked) <= budget
+
+
+def test_nothing_is_squeezed_in_below_min_chunk_tokens():
+    texts = [sentences(f"chunk{i}", 8) for i in range(2)]
+    budget = estimate_tokens(texts[0]) + 10
+    picked = assemble_context(
+        [hit(0, texts[0]), hit(2, texts[1])], token_budget=budget, min_chunk_tokens=20
+    )
+    assert [chunk.text for chunk in picked] == [texts[0]]
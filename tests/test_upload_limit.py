@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from app.helper import RequestBodyLimitMiddleware
+
+LIMIT = 64 * 1024
+
+
+def make_app() -> tuple[FastAPI, list[str]]:
+    handled: list[str] = []
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        handled.append(file.filename)
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(RequestBodyLimitMiddleware, limits={"/upload": LIMIT})
+    return app, handled
+
+
+def post(app: FastAPI, path: str, **kwargs) -> httpx.Response:
+    async def send() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+
+    return asyncio.run(send())
+
+
+def multipart(size: int) -> tuple[bytes, dict]:
+    request = httpx.Request(
+        "POST", "http://test", files={"file": ("a.bin", b"x" * size)}
+    )
+    return request.read(), {"content-type": request.headers["content-type"]}
+
+
+def test_body_within_the_limit_reaches_the_route():
+    app, handled = make_app()
+    response = post(app, "/upload", files={"file": ("a.bin", b"x" * 1000)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+    assert handled == ["a.bin"]
+
+
+def test_declared_length_over_the_limit_is_refused_up_front():
+    app, handled = make_app()
+    response = post(app, "/upload", files={"file": ("a.bin", b"x" * (LIMIT + 1))})
+    assert response.status_code == 413
+    assert response.json() == {"message": "file too large"}
+    assert handled == []
+
+
+def test_streamed_body_is_cut_off_once_it_passes_the_limit():
+    app, handled = make_app()
+    body, headers = multipart(4 * LIMIT)
+    sent = 0
+
+    async def chunks():
+        # no content-length, so only the running count can catch it
+        nonlocal sent
+        for start in range(0, len(body), 4096):
+            sent += 4096
+            yield body[start : start + 4096]
+
+    response = post(app, "/upload", content=chunks(), headers=headers)
+    assert response.status_code == 413
+    assert handled == []
+    assert sent < 2 * LIMIT
+
+
+def test_routes_without_a_limit_are_untouched():
+    app, _ = make_app()
+    response = post(app, "/other", files={"file": ("a.bin", b"x" * (LIMIT * 2))})
+    assert response.status_code == 200